@@ -5,6 +5,7 @@ LoRA 管理和下载API
 
 import asyncio
 import logging
+from dataclasses import asdict
 from typing import Dict, List, Optional
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel, Field
@@ -61,7 +62,7 @@ async def get_lora_presets():
         for preset in presets:
             is_downloaded = downloader.is_preset_downloaded(preset.id)
             preset_response = LoRAPresetResponse(
-                **preset.__dict__,
+                **asdict(preset),
                 is_downloaded=is_downloaded
             )
             response.append(preset_response)
@@ -85,7 +86,7 @@ async def get_lora_preset(preset_id: str):
 
         is_downloaded = downloader.is_preset_downloaded(preset_id)
         return LoRAPresetResponse(
-            **preset.__dict__,
+            **asdict(preset),
             is_downloaded=is_downloaded
         )
 
@@ -256,10 +257,10 @@ async def delete_preset_file(preset_id: str):
 async def refresh_lora_options():
     """刷新LoRA选项（重新扫描本地文件）"""
     try:
-        from app.pipelines.lora_utils import get_lora_options_with_presets
+        from app.pipelines.lora_utils import discover_lora_options
 
-        # 清除缓存
-        get_lora_options_with_presets.cache_clear()
+        # 清除本地 LoRA 索引缓存
+        discover_lora_options.cache_clear()
 
         # 重新加载预设
         downloader = get_downloader()
@@ -278,7 +279,7 @@ async def get_download_stats():
     try:
         downloader = get_downloader()
         return {
-            "stats": downloader.stats,
+            "stats": downloader.get_public_stats(),
             "presets_count": len(downloader.presets),
             "downloaded_count": sum(1 for preset in downloader.presets.values()
                                   if downloader.is_preset_downloaded(preset.id))
@@ -1,10 +1,13 @@
 from fastapi import WebSocket, HTTPException, Request
 from fastapi.responses import StreamingResponse, JSONResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from types import SimpleNamespace
+from functools import partial
 from app.util import bytes_to_pil
+from app.services.frame_batcher import FrameBatcher
 import logging
 import asyncio
+import time
 import torch
 
 logger = logging.getLogger(__name__)
@@ -35,14 +38,37 @@ class SessionAPI:
         self._pipeline = None
         self._config = None
         self._conn_manager = None
+        self._batcher = None
+        self._params_adapter = None
+        self._settings_schemas = None
 
     def init_api(self, pipeline, config: dict, conn_manager_factory):
         self._pipeline = pipeline
         self._config = config
         self._conn_manager = conn_manager_factory()
+        # 预编译参数校验器，避免每帧重新构建 InputParams 的校验逻辑
+        self._params_adapter = TypeAdapter(pipeline.InputParams)
+        self._settings_schemas = None
+
+        # frame_buffer_size > 1 时把多个会话的并发帧合并为一个 denoising batch；
+        # 批次由输入图像拼接而成，只对图像输入的管道启用（txt2img 没有输入帧）
+        frame_buffer_size = int(config.get("frame_buffer_size", 1)) if config else 1
+        if self._batcher is not None:
+            self._batcher.close()
+        self._batcher = None
+        if (
+            frame_buffer_size > 1
+            and hasattr(pipeline, "predict_batch")
+            and pipeline.Info().input_mode == "image"
+        ):
+            self._batcher = FrameBatcher(pipeline.predict_batch, frame_buffer_size)
         logger.debug("SessionAPI initialized")
 
-    async def shutdown_api(self):
+    async def shutdown_api(self, release_cache: bool = True):
+        if self._batcher is not None:
+            self._batcher.close()
+            self._batcher = None
+
         try:
             if self._conn_manager is not None:
                 user_ids = list(self._conn_manager.active_connections.keys())
@@ -56,16 +82,14 @@ class SessionAPI:
 
         try:
             if self._pipeline is not None:
-                if hasattr(self._pipeline, "stream"):
-                    try:
-                        del self._pipeline.stream
-                    except Exception:
-                        pass
+                # 流及其缓存由 SessionService 清理管道时统一释放，这里只放下引用；
+                # 提前删除 stream 属性会让服务端的清理误判为无需处理
                 try:
                     del self._pipeline
                 except Exception:
                     pass
-                if torch.cuda.is_available():
+                # 重新加载时保留缓存的显存段，供新管道复用
+                if release_cache and torch.cuda.is_available():
                     torch.cuda.empty_cache()
         except Exception:
             pass
@@ -73,6 +97,8 @@ class SessionAPI:
         self._pipeline = None
         self._conn_manager = None
         self._config = None
+        self._params_adapter = None
+        self._settings_schemas = None
 
     # --- helpers and endpoint logic ---
     async def create_session(self):
@@ -195,8 +221,10 @@ class SessionAPI:
                         logger.warning(f"收到 next_frame 但没有参数: session_id={session_id}")
                         continue
 
-                    params = self._pipeline.InputParams(**params_dict)
-                    params = SimpleNamespace(**params.dict())
+                    params = self._params_adapter.validate_python(params_dict)
+                    params = SimpleNamespace(**params.model_dump())
+                    # 记录帧的接收时间，供 pipeline 判断帧是否过期
+                    params.ts = time.monotonic()
 
                     if info.input_mode == "image":
                         if not image_data:
@@ -274,14 +302,21 @@ class SessionAPI:
                     await asyncio.sleep(0.01)
                     continue
 
-                # pipeline.predict may be blocking, run in thread
-                image = await asyncio.to_thread(self._pipeline.predict, params)
+                # 允许 pipeline 在帧过期时查看是否已有更新的帧，丢帧时复用本会话的上一帧
+                params.newer_frame_available = partial(self._conn_manager.has_pending_data, session_id)
+                params.session_id = session_id
+
+                if self._batcher is not None:
+                    image = await self._batcher.submit(params)
+                else:
+                    # pipeline.predict may be blocking, run in thread
+                    image = await asyncio.to_thread(self._pipeline.predict, params)
                 if image is None:
                     logger.warning(f"Image generation failed: session_id={session_id}")
                     continue
 
-                from app.util import pil_to_frame
-                frame = pil_to_frame(image)
+                from app.util import image_to_frame
+                frame = image_to_frame(image)
                 frame_count += 1
 
                 # 轻量级内存管理 - 每50帧清理一次，避免激进清理
@@ -310,16 +345,18 @@ class SessionAPI:
     async def settings(self):
         if self._pipeline is None:
             raise HTTPException(status_code=503, detail="Pipeline not initialized")
-        info_schema = self._pipeline.Info.schema()
-        info = self._pipeline.Info()
-        page_content = info.page_content if info.page_content else ""
-        input_params = self._pipeline.InputParams.schema()
+        # 参数与元信息的 schema 由管道类静态决定，首次请求时生成后复用
+        if self._settings_schemas is None:
+            info = self._pipeline.Info()
+            self._settings_schemas = {
+                "info": self._pipeline.Info.model_json_schema(),
+                "input_params": self._pipeline.InputParams.model_json_schema(),
+                "page_content": info.page_content if info.page_content else "",
+            }
         return JSONResponse(
             {
-                "info": info_schema,
-                "input_params": input_params,
+                **self._settings_schemas,
                 "max_queue_size": self._config.get("max_queue_size", 0) if self._config else 0,
-                "page_content": page_content,
             }
         )
 
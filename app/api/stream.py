@@ -147,8 +147,8 @@ class ImageStreamHandler:
             if format.upper() == "JPEG" and image.mode != "RGB":
                 image = image.convert("RGB")
             
-            # 保存图像到缓冲区
-            image.save(buffer, format=format, quality=quality, optimize=True)
+            # 保存图像到缓冲区（JPEG 的 optimize 需要额外一遍 Huffman 优化，实时流中不值得）
+            image.save(buffer, format=format, quality=quality, optimize=format.upper() != "JPEG")
             
             return buffer.getvalue()
         
@@ -52,6 +52,16 @@ class PerformanceConfig(BaseModel):
     max_fps: int = 30
     warmup: int = 10
     frame_buffer_size: int = 1
+    stale_frame_threshold_ms: int = 80  # 帧等待超过该时长且已有新帧时丢弃
+    reuse_warmup: bool = True  # 复用 engine_dir 下持久化的编译缓存与预热结果
+    compile_model: bool = False  # 非 TensorRT 加速时用 torch.compile 编译 UNet
+    stream_cache_size: int = 1  # 按 LoRA 缓存的流数量（含当前流），1 表示切换时总是重建；每个流都是一整套常驻显存的模型
+    pipeline_latency_mode: Literal["latency", "throughput"] = "latency"  # "throughput" 时输入上传与上一帧计算重叠
+    lora_dtype: Optional[Literal["bf16", "fp16"]] = None  # 未融合的 LoRA 适配器权重使用的精度
+    output_cache_size: int = 0  # txt2img 按参数缓存的输出帧数，0 表示不缓存
+    sdpa_attention: bool = False  # 注意力改用 PyTorch SDPA（sm_80+ 走 FlashAttention-2），替代 xformers
+    quantization: Literal["none", "int8", "fp8"] = "none"  # UNet weight-only 量化（需要 torchao，fp8 需要 sm_89+）
+    t_index_schedule: Literal["table", "ays"] = "table"  # "ays" 时按 Align Your Steps 调度选取时间步（steps 即去噪次数，最多 4 次）
 
 
 class ServerConfig(BaseModel):
@@ -61,6 +71,7 @@ class ServerConfig(BaseModel):
     max_queue_size: int = 0
     timeout: int = 0
     use_safety_checker: bool = False
+    preload_services: bool = False  # 启动时并行加载所有服务的模型，而不是首次使用时懒加载
 
 
 class Config(BaseSettings):
@@ -69,6 +69,11 @@ class ConnectionManager:
                     overflow -= 1
             await queue.put(new_data)
 
+    def has_pending_data(self, user_id: UUID) -> bool:
+        """队列中是否还有等待处理的帧（用于判断当前帧是否已被新帧取代）"""
+        user_session = self.active_connections.get(user_id)
+        return bool(user_session) and not user_session["queue"].empty()
+
     def should_block_for_data(self) -> bool:
         """Whether stream processing should block until data is available."""
         return self._drain_strategy == "all"
@@ -11,34 +11,23 @@
 
 import gc
 import logging
-import sys
+import time
 from pathlib import Path
 from typing import Literal, Optional
 
 import torch
 from PIL import Image
 
-# 添加本地 StreamDiffusion 到路径
-streamdiffusion_root = Path(__file__).parent.parent / "lib" / "StreamDiffusion"
-streamdiffusion_src = streamdiffusion_root / "src"
-streamdiffusion_utils = streamdiffusion_root / "utils"
-
-# 添加 src 目录以导入 streamdiffusion 模块
-if str(streamdiffusion_src) not in sys.path:
-    sys.path.insert(0, str(streamdiffusion_src))
-
-# 添加 utils 目录以导入 wrapper
-if str(streamdiffusion_utils) not in sys.path:
-    sys.path.insert(0, str(streamdiffusion_utils))
-
-# 从本地 StreamDiffusion 导入
 from streamdiffusion.image_utils import postprocess_image
-from wrapper import StreamDiffusionWrapper
 
 from app.config import ModelConfig, GenerationConfig, PerformanceConfig
+from app.core.stream_wrapper import StreamDiffusionWrapper
 
 logger = logging.getLogger(__name__)
 
+# 每生成多少帧输出一次性能统计
+STATS_LOG_INTERVAL = 100
+
 
 class StreamDiffusionEngine:
     """StreamDiffusion 引擎管理器
@@ -85,6 +74,9 @@ class StreamDiffusionEngine:
         # 当前参数状态
         self.current_prompt: Optional[str] = None
         self.current_negative_prompt: Optional[str] = None
+
+        # 采样式性能统计（避免每帧格式化日志）
+        self._stats = {"frames": 0, "elapsed": 0.0}
         
         # 初始化引擎
         self._initialize_engine()
@@ -298,8 +290,7 @@ class StreamDiffusionEngine:
             raise RuntimeError("StreamDiffusion 引擎未初始化")
         
         try:
-            import time
-            start_time = time.time()
+            start_time = time.perf_counter()
             
             # 更新 prompt（如果变化）
             if prompt != self.current_prompt or negative_prompt != self.current_negative_prompt:
@@ -318,10 +309,16 @@ class StreamDiffusionEngine:
                     prompt=prompt,
                 )
             
-            # 性能日志（仅在debug模式下输出）
-            if logger.isEnabledFor(logging.DEBUG):
-                elapsed_time = (time.time() - start_time) * 1000
-                logger.debug(f"帧生成耗时: {elapsed_time:.1f}ms ({1000/elapsed_time:.1f} FPS)")
+            # 累计耗时，每 STATS_LOG_INTERVAL 帧输出一次平均值
+            stats = self._stats
+            stats["elapsed"] += time.perf_counter() - start_time
+            stats["frames"] += 1
+            if stats["frames"] >= STATS_LOG_INTERVAL:
+                if logger.isEnabledFor(logging.INFO):
+                    avg_ms = stats["elapsed"] / stats["frames"] * 1000
+                    logger.info("平均帧生成耗时: %.1fms (%.1f FPS)", avg_ms, 1000 / avg_ms)
+                stats["frames"] = 0
+                stats["elapsed"] = 0.0
             
             # StreamDiffusionWrapper 已经返回 PIL Image，无需后处理
             return output_image
@@ -422,12 +419,12 @@ class StreamDiffusionEngine:
             # Warmup 失败不应该阻止系统启动
     
     def cleanup_gpu_memory(self):
-        """清理 GPU 内存"""
+        """清理 GPU 内存（不同步设备，避免阻塞共用同一 GPU 的其他管道）"""
         try:
             gc.collect()
             if torch.cuda.is_available():
+                # 缓存分配器按 stream 记录块的使用情况，释放时无需先同步整个设备
                 torch.cuda.empty_cache()
-                torch.cuda.synchronize()
             logger.debug("GPU 内存已清理")
         except Exception as e:
             logger.warning(f"GPU 内存清理失败: {e}")
@@ -437,6 +434,8 @@ class StreamDiffusionEngine:
         try:
             if self.stream is not None:
                 del self.stream
-                self.cleanup_gpu_memory()
+                # 解释器退出时模块全局可能已被清空，CUDA 也可能已销毁
+                if torch is not None and torch.cuda.is_available():
+                    self.cleanup_gpu_memory()
         except Exception:
             pass
@@ -0,0 +1,37 @@
+"""StreamDiffusionWrapper 的唯一导入入口
+
+streamdiffusion 通过 pip install -e app/lib/StreamDiffusion 安装，
+但 utils/wrapper.py 不属于该包。这里按文件路径直接加载它，不修改 sys.path，
+路径错误会在导入时立即暴露；引擎和管道都从这里导入，共用同一个模块对象。
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+SD_WRAPPER_PATH = Path(__file__).resolve().parent.parent / "lib" / "StreamDiffusion" / "utils" / "wrapper.py"
+
+
+def _load_wrapper_module():
+    """加载 utils/wrapper.py，只在首次导入时执行一次"""
+    module = sys.modules.get("sd_wrapper")
+    if module is not None:
+        return module
+
+    spec = importlib.util.spec_from_file_location("sd_wrapper", SD_WRAPPER_PATH)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"无法加载 StreamDiffusionWrapper: {SD_WRAPPER_PATH}")
+    module = importlib.util.module_from_spec(spec)
+    # 先注册再执行，模块内的 dataclass / 类型注解解析需要能在 sys.modules 中找到自身
+    sys.modules["sd_wrapper"] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules["sd_wrapper"]
+        raise
+    return module
+
+
+StreamDiffusionWrapper = _load_wrapper_module().StreamDiffusionWrapper
+
+__all__ = ["StreamDiffusionWrapper"]
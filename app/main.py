@@ -1,9 +1,15 @@
+import os
+
+# 必须在 CUDA 初始化之前设置：可扩展显存段减少逐帧分配/释放带来的碎片，切换 LoRA 时不易 OOM
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True,max_split_size_mb:512")
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 import logging
 import asyncio
 import mimetypes
+import sys
 import torch
 
 from app.config import get_config, Config
@@ -19,6 +25,10 @@ from app.services.resource_monitor import (
     stop_resource_monitoring,
     managed_resource_cleanup,
 )
+from app.pipelines.lora_downloader import close_downloader
+
+# 去掉 sys.path 中的重复条目（如 PYTHONPATH 与工作目录重复），缩短每次导入的路径扫描
+sys.path[:] = list(dict.fromkeys(sys.path))
 
 # fix mime error on windows
 mimetypes.add_type("application/javascript", ".js")
@@ -69,7 +79,15 @@ async def startup_event():
     except Exception as e:
         logger.error(f"启动资源监控失败: {e}")
 
-    # 不在启动时加载模型，而是在首次使用时加载
+    # 默认不在启动时加载模型，而是在首次使用时加载
+    if config.server.preload_services:
+        services = list_services()
+        logger.info(f"预加载 {len(services)} 个服务的模型...")
+        # 各服务在独立的工作线程中构建管道，权重读取与显存分配可以重叠
+        results = await asyncio.gather(*(svc.startup() for svc in services), return_exceptions=True)
+        for svc, result in zip(services, results):
+            if isinstance(result, Exception):
+                logger.error(f"服务 {svc._name} 预加载失败: {result}")
 
 
 @app.on_event("shutdown")
@@ -95,6 +113,12 @@ async def shutdown_event():
                 else:
                     logger.info(f"服务 {services[i]._name} 清理成功")
 
+        # 关闭 LoRA 下载器的共享 HTTP 会话
+        try:
+            await close_downloader()
+        except Exception as e:
+            logger.error(f"关闭LoRA下载器失败: {e}")
+
         # 停止资源监控
         try:
             stop_resource_monitoring()
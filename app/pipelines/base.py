@@ -10,7 +10,7 @@ from typing import Literal
 from importlib import import_module
 
 import torch
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from PIL import Image
 
 
@@ -56,10 +56,8 @@ class BasePipeline(ABC):
             description="生成图像的文本提示词"
         )
         
-        class Config:
-            """Pydantic 配置"""
-            # 允许子类添加额外字段
-            extra = "allow"
+        # 允许子类添加额外字段；参数对象创建后不可变
+        model_config = ConfigDict(extra="allow", frozen=True)
     
     @abstractmethod
     def __init__(
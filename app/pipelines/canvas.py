@@ -66,7 +66,8 @@ class Pipeline(StreamDiffusionBasePipeline):
         """获取 canvas 特定的初始参数"""
         config = get_config()
         canvas_gen = config.canvas_generation
-        return self.InputParams(
+        # 配置来源可信，跳过 Pydantic 校验直接构造
+        return self.InputParams.model_construct(
             prompt=canvas_gen.prompt,
             negative_prompt=canvas_gen.negative_prompt,
             width=canvas_gen.width,
@@ -103,78 +104,4 @@ class Pipeline(StreamDiffusionBasePipeline):
         if not hasattr(params, 'image') or params.image is None:
             raise ValueError("img2img pipeline requires an input image")
 
-        # 使用 StreamDiffusionWrapper 的预处理功能
-        return self.stream.preprocess_image(params.image)
-
-    def prepare(self, prompt: str = "", **kwargs):
-        """
-        预处理和 warmup
-
-        Args:
-            prompt: 初始提示词
-            **kwargs: 其他参数
-        """
-        # 使用默认参数创建初始准备
-        initial_params = self._get_initial_params()
-        if prompt:
-            initial_params.prompt = prompt
-
-        # 更新其他参数
-        for key, value in kwargs.items():
-            if hasattr(initial_params, key):
-                setattr(initial_params, key, value)
-
-        self._prepare_if_needed(initial_params)
-
-    @classmethod
-    def get_info(cls) -> "Pipeline.Info":
-        """获取管道元信息"""
-        return cls.Info()
-
-    @classmethod
-    def get_input_params_schema(cls) -> dict:
-        """获取输入参数的 JSON Schema"""
-        # 使用 Pydantic 的 schema 生成功能
-        schema = cls.InputParams.model_json_schema()
-
-        # 转换为前端需要的格式
-        properties = {}
-        for field_name, field_info in schema.get("properties", {}).items():
-            # 跳过隐藏字段
-            if field_info.get("hide", False):
-                continue
-
-            properties[field_name] = {
-                "default": field_info.get("default", ""),
-                "title": field_info.get("title", field_name),
-                "id": field_name,
-                "type": field_info.get("type", "string"),
-                "description": field_info.get("description", ""),
-            }
-
-            # 添加范围字段
-            if "minimum" in field_info:
-                properties[field_name]["min"] = field_info["minimum"]
-            if "maximum" in field_info:
-                properties[field_name]["max"] = field_info["maximum"]
-
-            # 根据类型设置 field 类型
-            if field_info.get("type") == "number":
-                properties[field_name]["field"] = "range"
-            elif field_info.get("type") == "integer":
-                if field_name == "seed":
-                    properties[field_name]["field"] = "input"
-                else:
-                    properties[field_name]["field"] = "range"
-            elif field_name in ["prompt", "negative_prompt"]:
-                properties[field_name]["field"] = "textarea"
-            else:
-                properties[field_name]["field"] = "input"
-
-            # 处理选择字段
-            if field_name == "lora_selection" and "values" in field_info:
-                properties[field_name]["values"] = field_info["values"]
-
-        return {
-            "properties": properties
-        }
\ No newline at end of file
+        return self._preprocess_pil_image(params.image)
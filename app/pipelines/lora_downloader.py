@@ -4,19 +4,43 @@ LoRA 下载管理器
 """
 
 import asyncio
+import errno
 import logging
 import os
+import shutil
 import yaml
 import aiohttp
-import aiofiles
+import orjson
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
-from dataclasses import dataclass, asdict
-from datetime import datetime
+from typing import Dict, FrozenSet, List, Optional, Tuple, Any
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 import hashlib
-
-
-@dataclass
+import time
+from functools import lru_cache
+
+try:
+    # 优先使用 libyaml 的 C 实现
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# 每次从响应流读取的块大小，以及 aiohttp 的读缓冲大小
+_DOWNLOAD_CHUNK_SIZE = 1 << 20
+_READ_BUFSIZE = 10 * 1024 * 1024
+# 累积到该大小后才写入磁盘
+_WRITE_BUFFER_SIZE = 4 * 1024 * 1024
+# 统计信息中记录可续传部分文件偏移量的键
+_PARTIAL_STATS_KEY = ".partial"
+# 同时进行的下载数上限，避免对同一镜像打开过多连接
+_MAX_PARALLEL_DOWNLOADS = 3
+# 统计信息延迟写盘的间隔（秒），期间的多次更新合并为一次写入
+_STATS_FLUSH_DELAY = 2.0
+# safetensors 头部超过该大小时不再完整解析 JSON
+_HEADER_PARSE_LIMIT = 1 << 20
+
+
+@dataclass(slots=True)
 class LoRAPreset:
     """LoRA预设数据类"""
     id: str
@@ -29,9 +53,10 @@ class LoRAPreset:
     compatible_models: List[str]
     tags: List[str]
     preview_image: str = ""
+    sha256: str = ""  # 文件的 SHA-256 摘要（十六进制），为空时只做格式检查
 
 
-@dataclass
+@dataclass(slots=True)
 class DownloadTask:
     """下载任务数据类"""
     preset_id: str
@@ -43,14 +68,31 @@ class DownloadTask:
     progress: float = 0.0
     speed: float = 0.0  # KB/s
     error_message: str = ""
-    created_at: datetime = None
-    updated_at: datetime = None
+    created_at: datetime = field(default_factory=datetime.now)
+    # 下载循环中只记录 time.monotonic()，需要时再换算为 datetime
+    created_monotonic: float = field(default_factory=time.monotonic, repr=False)
+    updated_monotonic: float = field(default_factory=time.monotonic, repr=False)
+
+    @property
+    def elapsed(self) -> float:
+        """从创建到最近一次更新经过的秒数"""
+        return self.updated_monotonic - self.created_monotonic
+
+    @property
+    def updated_at(self) -> datetime:
+        """最近一次更新时间"""
+        return self.created_at + timedelta(seconds=self.elapsed)
 
-    def __post_init__(self):
-        if self.created_at is None:
-            self.created_at = datetime.now()
-        if self.updated_at is None:
-            self.updated_at = datetime.now()
+
+@lru_cache(maxsize=4)
+def _parse_presets(path: str, mtime_ns: int) -> Optional[Tuple[LoRAPreset, ...]]:
+    """解析预设文件；按 (路径, mtime) 缓存，文件未变化时直接复用结果"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = yaml.load(f, Loader=_YamlLoader)
+
+    if not data or 'presets' not in data:
+        return None
+    return tuple(LoRAPreset(**preset_data) for preset_data in data['presets'])
 
 
 class LoRADownloader:
@@ -67,6 +109,13 @@ class LoRADownloader:
         # 下载任务管理
         self.download_tasks: Dict[str, DownloadTask] = {}
         self.active_downloads: Dict[str, asyncio.Task] = {}
+        # 所有下载共享的 HTTP 会话，复用连接和 TLS 握手
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._download_sem = asyncio.Semaphore(_MAX_PARALLEL_DOWNLOADS)
+        # safetensors 校验结果缓存：(路径, mtime_ns, 大小) -> 是否有效
+        self._verified_files: Dict[Tuple[str, int, int], bool] = {}
+        # 已下载预设缓存：(LoRA 目录 mtime_ns, 预设 ID 集合)，目录内容变化时 mtime 随之改变
+        self._downloaded_cache: Optional[Tuple[int, FrozenSet[str]]] = None
 
         # 预设数据
         self.presets: Dict[str, LoRAPreset] = {}
@@ -75,6 +124,8 @@ class LoRADownloader:
         # 下载统计信息
         self.download_stats_file = self.lora_dir / ".download_stats.json"
         self.stats: Dict[str, Any] = {}
+        self._stats_dirty = False
+        self._stats_flush_task: Optional[asyncio.Task] = None
         self.load_stats()
 
     def load_presets(self):
@@ -84,16 +135,14 @@ class LoRADownloader:
                 self.logger.warning(f"预设文件不存在: {self.presets_file}")
                 return
 
-            with open(self.presets_file, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f)
-
-            if not data or 'presets' not in data:
+            presets = _parse_presets(str(self.presets_file), self.presets_file.stat().st_mtime_ns)
+            if presets is None:
                 self.logger.error("预设文件格式错误")
                 return
 
-            for preset_data in data['presets']:
-                preset = LoRAPreset(**preset_data)
+            for preset in presets:
                 self.presets[preset.id] = preset
+            self._downloaded_cache = None
 
             self.logger.info(f"加载了 {len(self.presets)} 个LoRA预设")
 
@@ -104,19 +153,18 @@ class LoRADownloader:
         """加载下载统计信息"""
         try:
             if self.download_stats_file.exists():
-                import json
-                with open(self.download_stats_file, 'r', encoding='utf-8') as f:
-                    self.stats = json.load(f)
+                self.stats = orjson.loads(self.download_stats_file.read_bytes())
         except Exception as e:
             self.logger.error(f"加载统计信息失败: {e}")
             self.stats = {}
 
     def save_stats(self):
-        """保存下载统计信息"""
+        """保存下载统计信息（先写临时文件再原子替换，避免写入中断损坏原文件）"""
         try:
-            import json
-            with open(self.download_stats_file, 'w', encoding='utf-8') as f:
-                json.dump(self.stats, f, ensure_ascii=False, indent=2, default=str)
+            data = orjson.dumps(self.stats, option=orjson.OPT_INDENT_2, default=str)
+            temp_path = self.download_stats_file.with_suffix('.json.tmp')
+            temp_path.write_bytes(data)
+            os.replace(temp_path, self.download_stats_file)
         except Exception as e:
             self.logger.error(f"保存统计信息失败: {e}")
 
@@ -134,8 +182,29 @@ class LoRADownloader:
         if not preset:
             return False
 
-        file_path = self.lora_dir / preset.filename
-        return file_path.exists() and file_path.stat().st_size > 0
+        return preset_id in self._downloaded_preset_ids()
+
+    def _downloaded_preset_ids(self) -> FrozenSet[str]:
+        """返回已下载的预设 ID，LoRA 目录未变化时直接复用上次结果"""
+        try:
+            dir_mtime = self.lora_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            return frozenset()
+
+        if self._downloaded_cache is None or self._downloaded_cache[0] != dir_mtime:
+            downloaded = set()
+            for preset in self.presets.values():
+                try:
+                    if (self.lora_dir / preset.filename).stat().st_size > 0:
+                        downloaded.add(preset.id)
+                except FileNotFoundError:
+                    pass
+            self._downloaded_cache = (dir_mtime, frozenset(downloaded))
+        return self._downloaded_cache[1]
+
+    def get_public_stats(self) -> Dict[str, Any]:
+        """获取对外公开的下载统计（不含断点续传偏移等内部记录）"""
+        return {key: value for key, value in self.stats.items() if key != _PARTIAL_STATS_KEY}
 
     def get_download_task(self, preset_id: str) -> Optional[DownloadTask]:
         """获取下载任务"""
@@ -191,43 +260,97 @@ class LoRADownloader:
         self.logger.info(f"开始下载预设 {preset_id} 从镜像 {mirror.get('name', url)}")
         return True
 
+    async def download_many(self, preset_ids: List[str], mirror_index: int = 0) -> Dict[str, bool]:
+        """批量下载多个预设并等待全部结束，返回每个预设是否已下载"""
+        for preset_id in preset_ids:
+            await self.start_download(preset_id, mirror_index)
+
+        # gather 被取消时会一并取消所有子任务
+        pending = [self.active_downloads[pid] for pid in preset_ids if pid in self.active_downloads]
+        if pending:
+            await asyncio.gather(*pending)
+
+        return {preset_id: self.is_preset_downloaded(preset_id) for preset_id in preset_ids}
+
     async def _download_file(self, task: DownloadTask):
         """下载文件的内部实现"""
+        file_path = self.lora_dir / task.filename
+        temp_path = file_path.with_suffix(f"{file_path.suffix}.tmp")
+        # 已确认写入临时文件的字节数，下载失败时据此保留可续传的部分
+        written_size = 0
         try:
-            task.status = "downloading"
-            file_path = self.lora_dir / task.filename
-            temp_path = file_path.with_suffix(f"{file_path.suffix}.tmp")
-
-            # 设置超时和连接池
-            timeout = aiohttp.ClientTimeout(total=300, connect=30)
-            connector = aiohttp.TCPConnector(limit=10, limit_per_host=5)
-
-            async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-                async with session.get(task.url) as response:
-                    if response.status != 200:
+            # 限制同时进行的下载数，排队中的任务保持 pending 状态
+            async with self._download_sem:
+                task.status = "downloading"
+
+                # 边下载边计算摘要，避免下载完成后再完整读一遍文件
+                preset = self.get_preset_by_id(task.preset_id)
+                expected_digest = preset.sha256.lower() if preset and preset.sha256 else ""
+                hasher = hashlib.sha256()
+
+                # 上次失败保留下来的部分文件；记录的偏移量不能超过文件实际长度
+                partial = self.stats.setdefault(_PARTIAL_STATS_KEY, {})
+                resume_from = 0
+                if temp_path.exists():
+                    resume_from = min(int(partial.get(task.preset_id, 0)), temp_path.stat().st_size)
+                written_size = resume_from
+                headers = {'Range': f'bytes={resume_from}-'} if resume_from > 0 else None
+
+                session = await self._get_session()
+                async with session.get(task.url, headers=headers) as response:
+                    if response.status == 206 and resume_from > 0:
+                        self.logger.info(f"预设 {task.preset_id} 从 {resume_from} 字节处继续下载")
+                    elif response.status == 200:
+                        # 服务器不支持 Range 时从头下载
+                        resume_from = written_size = 0
+                    else:
+                        # 续传位置无效（如 416）时丢弃部分文件，下次从头下载
+                        written_size = 0
                         raise Exception(f"HTTP {response.status}: {response.reason}")
 
-                    task.total_size = int(response.headers.get('content-length', 0))
-                    task.status = "downloading"
+                    if resume_from == 0 and partial.pop(task.preset_id, None) is not None:
+                        self._mark_stats_dirty()
 
-                    # 记录开始时间用于计算速度
-                    start_time = datetime.now()
-                    last_update_time = start_time
-                    last_downloaded_size = 0
+                    # 压缩传输时 content-length 是压缩后的大小，与写入的字节数不一致
+                    content_length = int(response.headers.get('content-length', 0))
+                    if response.headers.get('content-encoding') or content_length <= 0:
+                        task.total_size = 0
+                    else:
+                        task.total_size = resume_from + content_length
+                    task.status = "downloading"
 
-                    async with aiofiles.open(temp_path, 'wb') as f:
-                        async for chunk in response.content.iter_chunked(8192):
-                            if task.status == "cancelled":
-                                return
+                    # 续传时先把已有部分计入摘要
+                    if resume_from > 0:
+                        await asyncio.to_thread(self._hash_file_prefix, temp_path, resume_from, hasher)
+                    task.downloaded_size = resume_from
 
-                            await f.write(chunk)
+                    # 记录开始时间用于计算速度
+                    last_update_time = time.monotonic()
+                    last_downloaded_size = resume_from
+
+                    # 文件句柄在整个下载期间保持打开，同步写入放到线程中执行
+                    f = await asyncio.to_thread(open, temp_path, 'r+b' if resume_from > 0 else 'wb')
+                    try:
+                        if resume_from > 0:
+                            f.seek(resume_from)
+                            f.truncate()
+                        self._preallocate(f.fileno(), task.total_size)
+                        # 先在内存中累积，满 _WRITE_BUFFER_SIZE 后再写盘，减少线程池往返
+                        buffer = bytearray()
+                        async for chunk in response.content.iter_chunked(_DOWNLOAD_CHUNK_SIZE):
+                            buffer += chunk
+                            if len(buffer) >= _WRITE_BUFFER_SIZE:
+                                await asyncio.to_thread(f.write, buffer)
+                                written_size += len(buffer)
+                                buffer.clear()
+                            hasher.update(chunk)
                             task.downloaded_size += len(chunk)
 
                             # 更新进度和速度
-                            now = datetime.now()
-                            time_diff = (now - last_update_time).total_seconds()
+                            now = time.monotonic()
+                            time_diff = now - last_update_time
 
-                            if time_diff >= 1.0:  # 每秒更新一次速度
+                            if time_diff >= 0.5:  # 每 0.5 秒更新一次速度
                                 downloaded_diff = task.downloaded_size - last_downloaded_size
                                 task.speed = downloaded_diff / time_diff / 1024  # KB/s
                                 last_update_time = now
@@ -239,42 +362,180 @@ class LoRADownloader:
                             else:
                                 task.progress = min(task.downloaded_size / (1024 * 1024), 100)  # 默认按MB估算
 
-                            task.updated_at = now
+                            task.updated_monotonic = now
 
-            # 下载完成，重命名临时文件
-            temp_path.rename(file_path)
+                        if buffer:
+                            await asyncio.to_thread(f.write, buffer)
+                            written_size += len(buffer)
+                    finally:
+                        await asyncio.to_thread(f.close)
 
-            # 验证文件完整性
-            if self._verify_file_integrity(file_path):
-                task.status = "completed"
-                task.progress = 100.0
-                task.speed = 0.0
+                # 预分配后文件长度固定为 content-length，需确认确实下载完整
+                if task.total_size > 0 and task.downloaded_size != task.total_size:
+                    raise Exception(f"下载不完整: {task.downloaded_size}/{task.total_size} 字节")
 
-                # 更新统计信息
-                self._update_download_stats(task)
+                if expected_digest and hasher.hexdigest() != expected_digest:
+                    temp_path.unlink()
+                    raise Exception("文件摘要校验失败")
 
-                self.logger.info(f"预设 {task.preset_id} 下载完成")
-            else:
-                file_path.unlink()
-                raise Exception("文件完整性验证失败")
+                # 下载完成，重命名临时文件；跨文件系统时退化为复制
+                try:
+                    temp_path.rename(file_path)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    await asyncio.to_thread(self._copy_across_devices, temp_path, file_path)
+                    temp_path.unlink()
+                # 同一时间戳粒度内的多次变化不一定改变目录 mtime，显式失效
+                self._downloaded_cache = None
+
+                # 摘要已校验通过时无需再读取文件做格式检查
+                if expected_digest or self._verify_file_integrity(file_path):
+                    task.status = "completed"
+                    task.progress = 100.0
+                    task.speed = 0.0
+
+                    # 更新统计信息（延迟合并写盘，避免批量下载时频繁写文件）
+                    self.stats[_PARTIAL_STATS_KEY].pop(task.preset_id, None)
+                    self._update_download_stats(task)
+                    self._mark_stats_dirty()
+
+                    # 让新下载的 LoRA 出现在本地索引中
+                    from .lora_utils import discover_lora_options
+                    discover_lora_options.cache_clear()
+
+                    self.logger.info(f"预设 {task.preset_id} 下载完成")
+                else:
+                    file_path.unlink()
+                    raise Exception("文件完整性验证失败")
 
         except asyncio.CancelledError:
-            task.status = "cancelled"
+            if task.status == "cancelled":
+                # 用户主动取消（cancel_download 已先标记状态）：不保留续传数据
+                await self._discard_partial(task.preset_id, temp_path)
+            else:
+                # 服务关闭等外部取消：保留已写入的部分；仍在排队时还没有动过临时文件
+                if task.status == "downloading":
+                    await self._keep_partial(task.preset_id, temp_path, written_size)
+                task.status = "cancelled"
             self.logger.info(f"预设 {task.preset_id} 下载已取消")
         except Exception as e:
             task.status = "failed"
             task.error_message = str(e)
             self.logger.error(f"下载预设 {task.preset_id} 失败: {e}")
-
-            # 清理临时文件
-            temp_path = self.lora_dir / f"{task.filename}.tmp"
-            if temp_path.exists():
-                temp_path.unlink()
+            await self._keep_partial(task.preset_id, temp_path, written_size)
         finally:
             # 清理活动下载任务
             if task.preset_id in self.active_downloads:
                 del self.active_downloads[task.preset_id]
 
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """获取共享的 HTTP 会话，首次使用时创建"""
+        if self._session is None or self._session.closed:
+            # 不限制总时长（大文件在慢速网络上可能需要很久），只在连接或读取停滞时超时
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=None, connect=30, sock_connect=30, sock_read=60),
+                connector=aiohttp.TCPConnector(limit=32, limit_per_host=8, ttl_dns_cache=300),
+                read_bufsize=_READ_BUFSIZE,
+            )
+        return self._session
+
+    async def close(self):
+        """取消进行中的下载并关闭共享的 HTTP 会话"""
+        for task in list(self.active_downloads.values()):
+            task.cancel()
+        if self.active_downloads:
+            await asyncio.gather(*self.active_downloads.values(), return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+        # 立即写出尚未落盘的统计信息
+        if self._stats_flush_task is not None:
+            self._stats_flush_task.cancel()
+            try:
+                await self._stats_flush_task
+            except asyncio.CancelledError:
+                pass
+            self._stats_flush_task = None
+        if self._stats_dirty:
+            self._stats_dirty = False
+            await asyncio.to_thread(self.save_stats)
+
+    def _mark_stats_dirty(self):
+        """标记统计信息待写盘，由后台任务延迟合并写入"""
+        self._stats_dirty = True
+        if self._stats_flush_task is None or self._stats_flush_task.done():
+            self._stats_flush_task = asyncio.create_task(self._flush_stats_later())
+
+    async def _flush_stats_later(self):
+        """等待一段时间后写盘；写盘期间又有更新时继续下一轮"""
+        while self._stats_dirty:
+            await asyncio.sleep(_STATS_FLUSH_DELAY)
+            self._stats_dirty = False
+            await asyncio.to_thread(self.save_stats)
+
+    async def _keep_partial(self, preset_id: str, temp_path: Path, written_size: int):
+        """保留已写入的部分以便下次续传；没有可用数据时清理临时文件"""
+        if not temp_path.exists():
+            return
+        if written_size > 0:
+            os.truncate(temp_path, written_size)
+            self.stats.setdefault(_PARTIAL_STATS_KEY, {})[preset_id] = written_size
+            self._mark_stats_dirty()
+        else:
+            temp_path.unlink()
+
+    async def _discard_partial(self, preset_id: str, temp_path: Path):
+        """删除临时文件及其续传记录"""
+        if temp_path.exists():
+            temp_path.unlink()
+        if self.stats.get(_PARTIAL_STATS_KEY, {}).pop(preset_id, None) is not None:
+            self._mark_stats_dirty()
+
+    @staticmethod
+    def _hash_file_prefix(path: Path, length: int, hasher):
+        """把文件前 length 字节计入摘要（续传时使用）"""
+        with open(path, 'rb') as f:
+            while length > 0:
+                data = f.read(min(length, _DOWNLOAD_CHUNK_SIZE))
+                if not data:
+                    break
+                hasher.update(data)
+                length -= len(data)
+
+    def _preallocate(self, fd: int, size: int):
+        """已知文件大小时一次性预分配磁盘空间，减少边写边扩展带来的碎片和元数据更新"""
+        if size <= 0 or not hasattr(os, "posix_fallocate"):
+            return
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError as e:
+            # 部分文件系统不支持预分配，忽略即可
+            self.logger.debug(f"预分配磁盘空间失败: {e}")
+
+    @staticmethod
+    def _copy_across_devices(src_path: Path, dst_path: Path):
+        """复制到另一个文件系统，Linux 上用 copy_file_range 在内核中完成数据搬运"""
+        with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+            if hasattr(os, "copy_file_range"):
+                try:
+                    remaining = os.fstat(src.fileno()).st_size
+                    while remaining > 0:
+                        copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                        if copied == 0:
+                            break
+                        remaining -= copied
+                    if remaining == 0:
+                        return
+                except OSError:
+                    pass
+                # 内核不支持时从头用用户态复制
+                src.seek(0)
+                dst.seek(0)
+                dst.truncate()
+            shutil.copyfileobj(src, dst, _WRITE_BUFFER_SIZE)
+
     def _verify_file_integrity(self, file_path: Path) -> bool:
         """验证文件完整性"""
         try:
@@ -301,57 +562,64 @@ class LoRADownloader:
             return False
 
     def _verify_safetensors(self, file_path: Path) -> bool:
-        """验证safetensors文件格式"""
+        """验证safetensors文件格式（结果按路径、mtime、大小缓存）"""
         try:
-            import struct
-            with open(file_path, 'rb') as f:
-                # 读取前8字节：头部长度（小端序）
-                header_len_bytes = f.read(8)
-                if len(header_len_bytes) != 8:
-                    return False
+            stat = file_path.stat()
+            cache_key = (str(file_path), stat.st_mtime_ns, stat.st_size)
+            cached = self._verified_files.get(cache_key)
+            if cached is None:
+                cached = self._check_safetensors_header(file_path, stat.st_size)
+                self._verified_files[cache_key] = cached
+            return cached
+        except Exception as e:
+            self.logger.error(f"safetensors验证失败 {file_path}: {e}")
+            return False
 
-                header_len = struct.unpack('<Q', header_len_bytes)[0]
+    def _check_safetensors_header(self, file_path: Path, file_size: int) -> bool:
+        """检查 safetensors 头部，最多读取 _HEADER_PARSE_LIMIT 字节"""
+        import struct
+        with open(file_path, 'rb') as f:
+            # 读取前8字节：头部长度（小端序）
+            header_len_bytes = f.read(8)
+            if len(header_len_bytes) != 8:
+                return False
 
-                # 检查头部长度是否合理（不超过文件大小）
-                file_size = file_path.stat().st_size
-                if header_len <= 0 or header_len > file_size - 8:
-                    return False
+            header_len = struct.unpack('<Q', header_len_bytes)[0]
 
-                # 读取头部数据并验证是否为有效的JSON
-                header_data = f.read(header_len)
-                if len(header_data) != header_len:
-                    return False
+            # 检查头部长度是否合理（不超过文件大小）
+            if header_len <= 0 or header_len > file_size - 8:
+                return False
 
-                # 验证是否以JSON开头
-                if not header_data.startswith(b'{'):
-                    return False
+            prefix = f.read(min(header_len, _HEADER_PARSE_LIMIT))
+            if not prefix.startswith(b'{'):
+                return False
 
-                # 尝试解析JSON以验证格式正确性
+            if header_len <= _HEADER_PARSE_LIMIT:
+                # 头部较小时完整解析JSON
                 try:
                     import json
-                    json_str = header_data.decode('utf-8').rstrip('\x00')
-                    json.loads(json_str)
+                    json.loads(prefix.decode('utf-8').rstrip('\x00'))
                     return True
-                except json.JSONDecodeError:
+                except (UnicodeDecodeError, json.JSONDecodeError):
                     return False
-        except Exception as e:
-            self.logger.error(f"safetensors验证失败 {file_path}: {e}")
-            return False
+
+            # 头部过大时只检查结尾（头部可能以空格填充），完整解析交给 safetensors 加载器
+            tail_len = min(header_len, 64)
+            f.seek(8 + header_len - tail_len)
+            return f.read(tail_len).rstrip(b' \x00').endswith(b'}')
 
     def _update_download_stats(self, task: DownloadTask):
         """更新下载统计信息"""
         try:
-            preset_id = task.preset_id
             file_size = task.downloaded_size
+            elapsed = max(1e-3, task.elapsed)
 
-            self.stats[preset_id] = {
-                'downloaded_at': datetime.now().isoformat(),
+            self.stats[task.preset_id] = {
+                'downloaded_at': task.updated_at.isoformat(),
                 'file_size': file_size,
-                'download_time': (task.updated_at - task.created_at).total_seconds(),
-                'average_speed': file_size / max(1, (task.updated_at - task.created_at).total_seconds()) / 1024  # KB/s
+                'download_time': elapsed,
+                'average_speed': file_size / elapsed / 1024  # KB/s
             }
-
-            self.save_stats()
         except Exception as e:
             self.logger.error(f"更新下载统计信息失败: {e}")
 
@@ -362,18 +630,20 @@ class LoRADownloader:
 
         task = self.download_tasks[preset_id]
 
-        # 标记为取消
+        # 先标记状态，下载协程据此区分主动取消和外部取消
         task.status = "cancelled"
 
-        # 取消异步任务
-        if preset_id in self.active_downloads:
-            self.active_downloads[preset_id].cancel()
-            del self.active_downloads[preset_id]
+        # 取消异步任务并等待其完成清理；CancelledError 会直接中断正在进行的读取
+        download_task = self.active_downloads.get(preset_id)
+        if download_task is not None:
+            download_task.cancel()
+            try:
+                await download_task
+            except asyncio.CancelledError:
+                pass
 
-        # 清理临时文件
-        temp_path = self.lora_dir / f"{task.filename}.tmp"
-        if temp_path.exists():
-            temp_path.unlink()
+        # 下载协程可能早已结束（如失败后保留了部分文件），主动取消不保留续传数据
+        await self._discard_partial(preset_id, self.lora_dir / f"{task.filename}.tmp")
 
         self.logger.info(f"已取消下载预设 {preset_id}")
         return True
@@ -390,6 +660,10 @@ class LoRADownloader:
 
         try:
             file_path.unlink()
+            self._downloaded_cache = None
+
+            from .lora_utils import discover_lora_options
+            discover_lora_options.cache_clear()
 
             # 清理统计信息
             if preset_id in self.stats:
@@ -406,33 +680,18 @@ class LoRADownloader:
         """获取包含预设的LoRA选项（与原有discover_lora_options兼容）"""
         from .lora_utils import discover_lora_options
 
-        # 获取现有的LoRA选项
+        # 获取现有的LoRA选项（lru_cache 返回的对象不能原地修改）
         existing_options, existing_paths = discover_lora_options()
 
-        # 添加预设选项
-        new_options = []
-        new_paths = {}
-
-        # 保持原有选项
-        for option in existing_options:
-            new_options.append(option)
-
-        for key, path in existing_paths.items():
-            new_paths[key] = path
-
-        # 添加未下载的预设选项
-        for preset in self.presets.values():
-            if not self.is_preset_downloaded(preset.id):
-                option_value = f"preset:{preset.id}"
-                option_label = f"📥 {preset.name} ({preset.size})"
+        # 追加未下载的预设选项，值形如 preset:<id>，路径映射到自身
+        preset_options = [
+            {"label": f"📥 {preset.name} ({preset.size})", "value": f"preset:{preset.id}"}
+            for preset in self.presets.values()
+            if not self.is_preset_downloaded(preset.id)
+        ]
+        preset_paths = {option["value"]: option["value"] for option in preset_options}
 
-                new_options.append({
-                    "label": option_label,
-                    "value": option_value
-                })
-                new_paths[option_value] = f"preset:{preset.id}"
-
-        return new_options, new_paths
+        return [*existing_options, *preset_options], {**existing_paths, **preset_paths}
 
 
 # 全局下载管理器实例
@@ -444,4 +703,10 @@ def get_downloader() -> LoRADownloader:
     global _downloader
     if _downloader is None:
         _downloader = LoRADownloader()
-    return _downloader
\ No newline at end of file
+    return _downloader
+
+
+async def close_downloader():
+    """关闭全局下载器（如已创建）"""
+    if _downloader is not None:
+        await _downloader.close()
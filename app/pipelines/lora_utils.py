@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from functools import lru_cache
+import os
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import logging
@@ -14,6 +15,31 @@ LORA_DIR = (
 )
 
 _SUPPORTED_SUFFIXES = {".safetensors", ".pt", ".bin", ".ckpt"}
+_SUPPORTED_SUFFIX_TUPLE = tuple(_SUPPORTED_SUFFIXES)
+
+
+def _iter_lora_files(root: Path) -> List[Path]:
+    """递归扫描 LoRA 文件（按路径排序）
+
+    使用 os.scandir 复用目录项中缓存的类型信息，只为匹配的文件创建 Path。
+    """
+    files: List[Path] = []
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif (
+                        entry.name.lower().endswith(_SUPPORTED_SUFFIX_TUPLE)
+                        and entry.is_file()
+                    ):
+                        files.append(Path(entry.path))
+        except OSError:
+            continue
+    files.sort()
+    return files
 
 
 def _build_option_entry(label: str, value: str) -> Dict[str, str]:
@@ -37,10 +63,7 @@ def discover_lora_options() -> Tuple[List[Dict[str, str]], Dict[str, str]]:
         return options, path_map
 
     seen_values: Dict[str, int] = {}
-    for file in sorted(LORA_DIR.glob("**/*")):
-        if not file.is_file() or file.suffix.lower() not in _SUPPORTED_SUFFIXES:
-            continue
-
+    for file in _iter_lora_files(LORA_DIR):
         base_value = file.stem
         if base_value in seen_values:
             seen_values[base_value] += 1
@@ -104,11 +127,12 @@ def resolve_lora_path(lora_selection: str) -> Optional[str]:
             logger.error(f"解析预设LoRA路径失败: {e}")
             return None
 
-    # 本地LoRA
-    if LORA_DIR.exists():
-        for file in sorted(LORA_DIR.glob("**/*")):
-            if file.is_file() and file.suffix.lower() in _SUPPORTED_SUFFIXES:
-                if file.stem == lora_selection or str(file) == lora_selection:
-                    return str(file)
+    # 本地LoRA：复用 discover_lora_options 缓存的索引，不再扫描目录
+    _, path_map = discover_lora_options()
+    hit = path_map.get(lora_selection)
+    if hit:
+        return hit
+    if lora_selection in path_map.values():
+        return lora_selection
 
     return None
@@ -4,11 +4,22 @@ StreamDiffusion 通用基类
 为所有基于 StreamDiffusionWrapper 的管道提供通用功能，减少代码重复。
 """
 
+import bisect
+import hashlib
 import logging
+import math
+import os
 import random
+import time
+import weakref
 from abc import abstractmethod
-from typing import Any, Dict, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache, wraps
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 import torch
 from pydantic import BaseModel, Field
 from PIL import Image
@@ -16,9 +27,140 @@ from PIL import Image
 from app.pipelines.base import BasePipeline
 from app.pipelines.lora_utils import get_lora_options_with_presets, resolve_lora_path
 from app.config import get_config
+from app.core.stream_wrapper import StreamDiffusionWrapper
 
-# 全局 LoRA 选项（避免重复加载）
-LORA_OPTIONS, LORA_PATHS = get_lora_options_with_presets()
+
+@lru_cache(maxsize=1)
+def _lora_options() -> Tuple[List[Dict[str, str]], Dict[str, str]]:
+    """全局 LoRA 选项，首次使用时才扫描目录（导入模块时不阻塞启动）"""
+    return get_lora_options_with_presets()
+
+
+def _lora_selection_schema(schema: Dict[str, Any]) -> None:
+    """生成 JSON Schema 时才填入 LoRA 选项"""
+    schema.update(id="lora_selection", field="select", values=_lora_options()[0])
+
+
+# 输入尺寸固定，让 cuDNN 选择最快的卷积算法；fp32 残留算子允许使用 TF32
+torch.backends.cudnn.benchmark = True
+torch.backends.cuda.matmul.allow_tf32 = True
+torch.set_float32_matmul_precision("high")
+
+# 半精度推理支持的数据类型（bfloat16 适用于 Ampere/Ada/Hopper）
+_HALF_DTYPES = (torch.float16, torch.bfloat16)
+
+# prepare 键（元组）各位置对应的 stream.prepare 参数名；前两项只影响文本编码，
+# 其余参数变化需要重建调度器状态
+_PREPARE_ARG_NAMES = ("prompt", "negative_prompt", "num_inference_steps", "guidance_scale", "delta")
+
+# 文本 embedding 缓存的最大条目数
+_EMBED_CACHE_SIZE = 32
+
+# 保留上一帧输出的会话数上限（LRU，断开的会话随之淘汰）
+_LAST_OUTPUT_SESSIONS = 16
+
+# steps -> t_index_list（界面允许的 1~10 步预先算好）
+_T_INDEX_TABLE = {
+    1: (0,),
+    **{steps: (0, 1) for steps in range(2, 5)},
+    **{steps: (steps // 2, steps - 1) for steps in range(5, 11)},
+}
+
+# Align Your Steps 为 SD1.5 优化的 10 步 sigma 调度（末项为终止 sigma）
+_AYS_SIGMAS_SD15 = (14.615, 6.475, 3.861, 2.697, 1.886, 1.396, 0.963, 0.652, 0.399, 0.152, 0.029)
+
+# AYS 调度下 prepare 使用的调度器步数，t_index 即该时间步网格上的下标
+_WRAPPER_TIMESTEPS = 50
+
+# AYS 调度下每帧 UNet 去噪次数上限（去噪批大小随之增长，帧率成倍下降）
+_AYS_MAX_PASSES = 4
+
+# 与参数无关的 StreamDiffusionWrapper 配置
+_BASE_STREAM_CONFIG = {
+    "output_type": "pt",  # 输出张量，JPEG 编码时再转换，省去逐帧 PIL 分配
+    "mode": "img2img",
+    "use_denoising_batch": True,
+    "cfg_type": "none",
+}
+
+
+@lru_cache(maxsize=None)
+def _sd15_log_sigmas(num_train_timesteps: int) -> Tuple[float, ...]:
+    """SD1.5 scaled-linear beta 调度下各训练时间步的 log sigma（随时间步单调递增）"""
+    beta_start, beta_end = math.sqrt(0.00085), math.sqrt(0.012)
+    alpha_cumprod = 1.0
+    log_sigmas = []
+    for t in range(num_train_timesteps):
+        beta = (beta_start + (beta_end - beta_start) * t / (num_train_timesteps - 1)) ** 2
+        alpha_cumprod *= 1.0 - beta
+        log_sigmas.append(0.5 * math.log((1.0 - alpha_cumprod) / alpha_cumprod))
+    return tuple(log_sigmas)
+
+
+@lru_cache(maxsize=None)
+def compute_ays_indices(
+    steps: int,
+    total_timesteps: int = _WRAPPER_TIMESTEPS,
+    num_train_timesteps: int = 1000,
+) -> Tuple[int, ...]:
+    """
+    按 Align Your Steps 调度计算 t_index_list
+
+    对 10 步 AYS sigma 调度做对数线性插值得到 steps 个 sigma，换算成训练时间步后
+    映射到 StreamDiffusionWrapper 的时间步网格（下标 0 为噪声最强的时间步）。
+
+    Args:
+        steps: UNet 去噪次数
+        total_timesteps: 调度器时间步网格大小
+        num_train_timesteps: 模型训练时间步数
+
+    Returns:
+        严格递增的 t_index 元组
+    """
+    steps = max(1, min(int(steps), total_timesteps))
+    log_ays = [math.log(sigma) for sigma in _AYS_SIGMAS_SD15]
+    last = len(log_ays) - 1
+
+    log_sigmas = _sd15_log_sigmas(num_train_timesteps)
+    stride = num_train_timesteps / total_timesteps
+    indices: List[int] = []
+    for i in range(steps):
+        # 插值出 steps + 1 个 sigma，最后一个是终止 sigma，不对应去噪步
+        position = i * last / steps
+        lower = int(position)
+        upper = min(lower + 1, last)
+        log_sigma = log_ays[lower] + (log_ays[upper] - log_ays[lower]) * (position - lower)
+
+        timestep = min(bisect.bisect_left(log_sigmas, log_sigma), num_train_timesteps - 1)
+        index = round((num_train_timesteps - 1 - timestep) / stride)
+        # 保证下标严格递增且不越界（步数接近网格大小时相邻 sigma 可能落到同一下标）
+        if indices:
+            index = max(index, indices[-1] + 1)
+        indices.append(min(index, total_timesteps - steps + i))
+    return tuple(indices)
+
+
+def no_autograd(method):
+    """
+    在关闭 autograd 的上下文中执行管道方法
+
+    默认使用 inference_mode；启用 torch.compile 时改用 no_grad，
+    inference_mode 产生的张量与编译后的 CUDA Graph 配合存在已知问题。
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._grad_mode():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+@dataclass
+class _StreamEntry:
+    """缓存中未激活的流及其参数状态"""
+    stream: Any
+    prepare_key: Optional[Tuple[Any, ...]]
+    embed_cache: "OrderedDict[bytes, torch.Tensor]"
+    frame_buffer_size: int
 
 
 class StreamDiffusionBasePipeline(BasePipeline):
@@ -82,9 +224,7 @@ class StreamDiffusionBasePipeline(BasePipeline):
         lora_selection: str = Field(
             "none",
             title="LoRA Selection",
-            id="lora_selection",
-            field="select",
-            values=LORA_OPTIONS,
+            json_schema_extra=_lora_selection_schema,
         )
 
     def __init__(self, args: Dict[str, Any], device: torch.device, torch_dtype: torch.dtype):
@@ -99,15 +239,57 @@ class StreamDiffusionBasePipeline(BasePipeline):
         self.logger = logging.getLogger(self.__class__.__name__)
         self._args = dict(args)
         self._device = device
+
+        # CUDA 上强制使用全半精度推理，而不是 fp32 + autocast
+        if device.type == "cuda" and torch_dtype not in _HALF_DTYPES:
+            self.logger.warning("CUDA 推理使用 %s 性能较差，已切换为 float16", torch_dtype)
+            torch_dtype = torch.float16
         self._torch_dtype = torch_dtype
-        self._prepare_cache: Dict[str, Any] = {}
+        self._prepare_key: Optional[Tuple[Any, ...]] = None
+        self._embed_cache: "OrderedDict[bytes, torch.Tensor]" = OrderedDict()
         self._active_lora: Optional[str] = None
+        # 按 LoRA 选择缓存已构建的流，来回切换时无需重新加载模型
+        self._stream_cache: "OrderedDict[str, _StreamEntry]" = OrderedDict()
+        self._stream_cache_size = max(1, int(self._args.get("stream_cache_size", 1)))
+        # seed < 0 时使用的随机种子，只生成一次，重建流（如切换 LoRA）时保持画面风格稳定
+        self._session_seed = random.randint(0, 2**31 - 1)
+        # 预先解析本地 LoRA 路径；预设 LoRA 的值为 "preset:<id>"，需在切换时再解析
+        self._lora_cache: Dict[str, Optional[Dict[str, float]]] = {
+            key: ({path: 1.0} if path else None)
+            for key, path in _lora_options()[1].items()
+            if not path.startswith("preset:")
+        }
 
-        # 创建初始流
-        initial_params = self._get_initial_params()
-        self.stream = self._create_stream(initial_params)
-        self._active_lora = initial_params.lora_selection
-        self._prepare_if_needed(initial_params)
+        # 过期帧丢弃策略：帧在队列中等待超过阈值且已有更新的帧时直接复用上一帧输出
+        self._stale_frame_threshold = float(self._args.get("stale_frame_threshold_ms", 80)) / 1000.0
+        # 同一管道服务所有会话，上一帧输出按会话保存，丢帧时不能返回其他会话的画面
+        self._last_outputs: "OrderedDict[Any, torch.Tensor]" = OrderedDict()
+        self._dropped_frames = 0
+        self._frame_buffer_size = 1
+        self._warmed_up = False
+        self._pending_warmup_marker: Optional[Path] = None
+
+        # 输入帧上传用的常驻缓冲：主机端锁页内存 + 设备端缓冲，按输入形状复用
+        self._h_buf: Optional[torch.Tensor] = None
+        self._d_buf: Optional[torch.Tensor] = None
+        self._upload_done: Optional[torch.cuda.Event] = None
+        # 吞吐优先模式：在独立的 CUDA stream 上传输入帧，与上一帧的计算重叠（首帧延迟略增）
+        self._upload_stream: Optional[torch.cuda.Stream] = None
+        if device.type == "cuda" and self._args.get("pipeline_latency_mode", "latency") == "throughput":
+            self._upload_stream = torch.cuda.Stream(device=device)
+
+        self._grad_mode = torch.no_grad if self._args.get("compile_model", False) else torch.inference_mode
+        # AYS 的 t_index 固定落在 _WRAPPER_TIMESTEPS 网格上，prepare 时必须使用同一网格
+        self._ays_schedule = self._args.get("t_index_schedule", "table") == "ays"
+
+        # 创建初始流（与 predict 一致地关闭 autograd，避免记录计算图）
+        # 初始参数只构建一次，prepare 时以其为模板覆盖
+        self._initial_params = initial_params = self._get_initial_params()
+        with self._grad_mode():
+            self.stream = self._create_stream(initial_params)
+            self._bind_stream()
+            self._active_lora = initial_params.lora_selection
+            self._prepare_if_needed(initial_params)
 
     @abstractmethod
     def _get_initial_params(self) -> InputParams:
@@ -138,31 +320,20 @@ class StreamDiffusionBasePipeline(BasePipeline):
 
     def _resolve_lora_dict(self, selection: Optional[str]) -> Optional[Dict[str, float]]:
         """解析 LoRA 选择"""
-        if not selection or selection == "none":
-            return None
+        selection = selection or "none"
+        if selection in self._lora_cache:
+            return self._lora_cache[selection]
 
-        # 使用新的路径解析函数
+        # 未预先解析的选项（如运行时下载完成的预设 LoRA）
         lora_path = resolve_lora_path(selection)
         if not lora_path:
             return None
 
-        return {lora_path: 1.0}
+        self._lora_cache[selection] = {lora_path: 1.0}
+        return self._lora_cache[selection]
 
     def _create_stream(self, params: InputParams):
         """创建 StreamDiffusionWrapper 实例"""
-        # 动态导入以避免循环导入
-        import sys
-        import os
-        sys.path.append(
-            os.path.join(
-                os.path.dirname(__file__),
-                "..",
-                "lib",
-                "StreamDiffusion",
-            )
-        )
-        from utils.wrapper import StreamDiffusionWrapper
-
         # 获取管道特定配置
         pipeline_config = self._get_pipeline_config(params)
 
@@ -172,31 +343,26 @@ class StreamDiffusionBasePipeline(BasePipeline):
 
         # 计算 t_index_list
         steps = max(1, int(params.steps))
-        if steps <= 4:
-            t_index_list = [0, 1] if steps >= 2 else [0]
-        elif steps <= 10:
-            t_index_list = [steps // 2, steps - 1]
+        if self._ays_schedule:
+            t_index_list = compute_ays_indices(min(steps, _AYS_MAX_PASSES))
         else:
-            t_index_list = [35, 45] if steps >= 50 else [steps // 2, steps - 1]
+            t_index_list = _T_INDEX_TABLE.get(steps) or ((35, 45) if steps >= 50 else (steps // 2, steps - 1))
 
         # 使用配置文件中的模型配置
         config = {
+            **_BASE_STREAM_CONFIG,
             "model_id_or_path": self._args.get("model_id", model_config.model_id),
             "use_tiny_vae": model_config.use_tiny_vae if not self._args.get("vae_id") else False,
             "device": self._device,
             "dtype": self._torch_dtype,
-            "t_index_list": t_index_list,
+            "t_index_list": list(t_index_list),
             "frame_buffer_size": pipeline_config.get("frame_buffer_size", 1),
             "width": params.width,
             "height": params.height,
             "use_lcm_lora": model_config.use_lcm_lora,
-            "output_type": "pil",
             "warmup": pipeline_config.get("warmup", 10),
             "vae_id": self._args.get("vae_id", model_config.vae_id),
             "acceleration": self._args.get("acceleration", model_config.acceleration),
-            "mode": "img2img",
-            "use_denoising_batch": True,
-            "cfg_type": "none",
             "use_safety_checker": self._args.get("use_safety_checker", False),
             "engine_dir": self._args.get("engine_dir", "engines"),
             "lora_dict": self._resolve_lora_dict(params.lora_selection),
@@ -205,33 +371,332 @@ class StreamDiffusionBasePipeline(BasePipeline):
 
         # 应用管道特定配置
         config.update(pipeline_config)
+        self._frame_buffer_size = max(1, int(config["frame_buffer_size"]))
+
+        warmup_marker = None
+        if self._args.get("reuse_warmup", True):
+            warmup_marker = self._configure_warmup_cache(config, params.lora_selection)
+
+        stream = StreamDiffusionWrapper(**config)
+        # 构建时已按目标分辨率预热过的流无需再 prewarm；torch.compile 在首次前向时才编译，
+        # 构建时的 warmup 发生在编译之前，编译后的前向仍需 prewarm 触发
+        compiled = self._args.get("compile_model", False) and config["acceleration"] != "tensorrt"
+        self._warmed_up = int(config["warmup"]) > 0 and not compiled
+        self._ensure_module_dtype(stream)
+        self._use_channels_last(stream)
+        if self._args.get("sdpa_attention", False):
+            self._use_sdpa_attention(stream, config["acceleration"])
+        if config["lora_dict"] and self._args.get("lora_dtype"):
+            self._cast_lora_layers(stream, self._args["lora_dtype"])
+        if self._args.get("quantization", "none") != "none":
+            self._quantize_unet(stream, self._args["quantization"], config["acceleration"])
+        if self._args.get("compile_model", False):
+            self._compile_unet(stream, config["acceleration"])
+
+        self._pending_warmup_marker = None
+        if warmup_marker is not None and not warmup_marker.exists():
+            if compiled:
+                # 编译产物在 prewarm 跑完编译后的前向时才写出，届时再写入标记
+                self._pending_warmup_marker = warmup_marker
+            else:
+                warmup_marker.touch()
+        return stream
+
+    def _configure_warmup_cache(self, config: Dict[str, Any], lora_selection: Optional[str]) -> Optional[Path]:
+        """
+        持久化编译 / TensorRT 预热产物，进程重启后直接复用
 
-        return StreamDiffusionWrapper(**config)
+        - TRITON_CACHE_DIR 指向 engine_dir 下的持久目录
+        - TensorRT 引擎与 inductor 编译缓存按 (模型, 宽, 高, 批大小, dtype, LoRA, 加速方式)
+          分目录存放，避免不同分辨率或 LoRA 误用同一份产物
+        - 同一组合已完成过预热且本组合的产物仍在磁盘上时跳过 warmup
+
+        Returns:
+            预热完成标记文件路径；不产生持久化产物的加速方式返回 None（照常 warmup）
+        """
+        engine_root = Path(config["engine_dir"])
+        os.environ.setdefault("TRITON_CACHE_DIR", str(engine_root / "triton"))
+
+        use_tensorrt = config["acceleration"] == "tensorrt"
+        if not use_tensorrt and not self._args.get("compile_model", False):
+            # none / xformers 没有可复用的产物，每次启动都需要预热
+            return None
+
+        cache_key = repr((
+            config["model_id_or_path"],
+            config["width"],
+            config["height"],
+            config["frame_buffer_size"],
+            str(config["dtype"]),
+            lora_selection or "none",
+            config["acceleration"],
+        ))
+        engine_dir = engine_root / hashlib.sha1(cache_key.encode("utf-8")).hexdigest()[:16]
+        engine_dir.mkdir(parents=True, exist_ok=True)
+        config["engine_dir"] = str(engine_dir)
+
+        warmup_marker = engine_dir / "warmup.done"
+        if use_tensorrt:
+            artifact_dir = engine_dir
+        else:
+            # UNet 在首次前向时才编译，此前切换到本组合的 inductor 缓存目录
+            artifact_dir = engine_dir / "inductor"
+            os.environ["TORCHINDUCTOR_CACHE_DIR"] = str(artifact_dir)
+
+        if warmup_marker.exists():
+            # 标记存在但产物已被清理时重新预热
+            has_artifacts = artifact_dir.is_dir() and any(
+                path.name != warmup_marker.name for path in artifact_dir.iterdir()
+            )
+            if has_artifacts:
+                self.logger.info("复用已持久化的预热产物: %s", artifact_dir)
+                config["warmup"] = 0
+        return warmup_marker
+
+    def _ensure_module_dtype(self, stream) -> None:
+        """确保 UNet、VAE（含 TAESD）和文本编码器都运行在同一半精度下"""
+        if self._torch_dtype not in _HALF_DTYPES:
+            return
+
+        inner = getattr(stream, "stream", None)
+        for attr_name in ("unet", "vae", "text_encoder"):
+            module = getattr(inner, attr_name, None)
+            # TensorRT 引擎不是 nn.Module，跳过
+            if isinstance(module, torch.nn.Module) and getattr(module, "dtype", None) != self._torch_dtype:
+                module.to(dtype=self._torch_dtype)
+
+    def _cast_lora_layers(self, stream, lora_dtype: str) -> None:
+        """
+        把未融合的 LoRA 适配器权重（PEFT 的 lora_A / lora_B）转换为指定精度
+
+        LoRA 已融合进 UNet 权重时不存在独立的适配器层，此时不做任何处理。
+        """
+        dtype = {"bf16": torch.bfloat16, "fp16": torch.float16}.get(lora_dtype)
+        unet = getattr(getattr(stream, "stream", None), "unet", None)
+        if dtype is None or not isinstance(unet, torch.nn.Module):
+            return
+
+        cast_count = 0
+        for module in unet.modules():
+            for attr_name in ("lora_A", "lora_B"):
+                adapter = getattr(module, attr_name, None)
+                if isinstance(adapter, torch.nn.Module):
+                    adapter.to(dtype=dtype)
+                    cast_count += 1
+        if cast_count:
+            self.logger.info("已将 %d 个 LoRA 适配器层转换为 %s", cast_count, lora_dtype)
+
+    def _use_channels_last(self, stream) -> None:
+        """UNet 和 VAE 改用 channels_last（NHWC），半精度卷积可走 Tensor Core 的快速内核"""
+        if self._device.type != "cuda":
+            return
+
+        inner = getattr(stream, "stream", None)
+        for attr_name in ("unet", "vae"):
+            module = getattr(inner, attr_name, None)
+            # TensorRT 引擎不是 nn.Module，跳过
+            if isinstance(module, torch.nn.Module):
+                module.to(memory_format=torch.channels_last)
+
+    def _use_sdpa_attention(self, stream, acceleration: str) -> None:
+        """
+        UNet 和 VAE 的注意力改用 PyTorch SDPA（AttnProcessor2_0）
+
+        sm_80 及以上 SDPA 会分派到 FlashAttention-2 内核；更早的 GPU 上保留 xformers 加速时
+        已设置的注意力实现。TensorRT 引擎不是 nn.Module，跳过。
+        """
+        if acceleration == "tensorrt" or self._device.type != "cuda":
+            return
+        if acceleration == "xformers" and torch.cuda.get_device_capability(self._device) < (8, 0):
+            self.logger.info("当前 GPU 低于 sm_80，保留 xformers 注意力")
+            return
+
+        from diffusers.models.attention_processor import AttnProcessor2_0
+
+        inner = getattr(stream, "stream", None)
+        for attr_name in ("unet", "vae"):
+            module = getattr(inner, attr_name, None)
+            # TAESD 没有注意力层，也没有 set_attn_processor
+            if isinstance(module, torch.nn.Module) and hasattr(module, "set_attn_processor"):
+                module.set_attn_processor(AttnProcessor2_0())
+        self.logger.info("注意力已切换为 PyTorch SDPA (FlashAttention-2)")
+
+    def _quantize_unet(self, stream, quantization: str, acceleration: str) -> None:
+        """
+        用 torchao 对 UNet 的 Linear 层做 weight-only 量化（int8 / fp8），减少权重读取带宽
+
+        时间步嵌入对数值较敏感，不量化；归一化层和卷积本身不在 Linear 量化范围内。
+        fp8 需要 sm_89 及以上，条件不满足或未安装 torchao 时保持原精度。
+        """
+        if acceleration == "tensorrt" or self._device.type != "cuda":
+            return
+
+        unet = getattr(getattr(stream, "stream", None), "unet", None)
+        if not isinstance(unet, torch.nn.Module):
+            return
+
+        try:
+            from torchao.quantization import quantize_, int8_weight_only, float8_weight_only
+        except ImportError:
+            self.logger.warning("未安装 torchao，跳过 UNet %s 量化", quantization)
+            return
+
+        if quantization == "fp8":
+            if torch.cuda.get_device_capability(self._device) < (8, 9):
+                self.logger.warning("当前 GPU 不支持 fp8（需要 sm_89 及以上），跳过 UNet 量化")
+                return
+            config = float8_weight_only()
+        else:
+            config = int8_weight_only()
+
+        def is_quantizable(module: torch.nn.Module, fqn: str) -> bool:
+            return isinstance(module, torch.nn.Linear) and not fqn.startswith(("time_embedding", "add_embedding"))
+
+        quantize_(unet, config, filter_fn=is_quantizable)
+        self.logger.info("UNet 已启用 %s weight-only 量化", quantization)
+
+    def _compile_unet(self, stream, acceleration: str) -> None:
+        """
+        用 torch.compile 编译 UNet（CUDA Graph + Triton 融合），减少逐帧的 Python 调度和 kernel 启动开销
+
+        TensorRT 加速时 UNet 已是编译后的引擎，不再重复编译。首帧会触发编译，
+        编译产物随 TORCHINDUCTOR_CACHE_DIR 持久化。
+        """
+        if acceleration == "tensorrt":
+            return
+
+        inner = getattr(stream, "stream", None)
+        unet = getattr(inner, "unet", None)
+        if not isinstance(unet, torch.nn.Module):
+            return
+
+        import torch._inductor.config as inductor_config
+        inductor_config.conv_1x1_as_mm = True
+        inductor_config.coordinate_descent_tuning = True
+
+        inner.unet = torch.compile(unet, mode="reduce-overhead", fullgraph=True)
+        self.logger.info("UNet 已启用 torch.compile (reduce-overhead)")
 
     def _normalize_seed(self, seed: int) -> int:
         """标准化种子值"""
         if seed is None:
             return 2
         if seed < 0:
-            return random.randint(0, 2**31 - 1)
+            return self._session_seed
         return int(seed)
 
+    def _make_prepare_key(self, params: InputParams) -> Tuple[Any, ...]:
+        """按 _PREPARE_ARG_NAMES 的顺序生成 prepare 参数元组"""
+        inner = getattr(self.stream, "stream", None)
+        # cfg_type="none" 时 UNet 不使用负向提示词，统一传空串：
+        # 仅负向提示词变化时不再触发 prepare，也不会为其运行文本编码器
+        cfg_disabled = getattr(inner, "cfg_type", None) == "none"
+        return (
+            params.prompt,
+            "" if cfg_disabled else params.negative_prompt,
+            _WRAPPER_TIMESTEPS if self._ays_schedule else max(1, int(params.steps)),
+            float(params.cfg_scale),
+            float(params.denoise),
+        )
+
     def _prepare_if_needed(self, params: InputParams) -> None:
         """根据需要准备流"""
-        prepare_args = {
-            "prompt": params.prompt,
-            "negative_prompt": params.negative_prompt,
-            "num_inference_steps": max(1, int(params.steps)),
-            "guidance_scale": float(params.cfg_scale),
-            "delta": float(params.denoise),
-        }
+        inner = getattr(self.stream, "stream", None)
+        # 逐帧比较元组，参数未变时不构造 prepare 参数字典
+        key = self._make_prepare_key(params)
+        if key == self._prepare_key:
+            return
 
-        if self._prepare_cache == prepare_args:
+        # 只有提示词变化时，仅更新文本 embedding，跳过完整的 prepare
+        if self._only_prompt_changed(key) and self._update_prompt_embeds(key):
+            self._prepare_key = key
             return
 
-        self.logger.debug("Preparing stream with updated parameters")
-        self.stream.prepare(**prepare_args)
-        self._prepare_cache = prepare_args
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Preparing stream with updated parameters")
+        self.stream.prepare(**dict(zip(_PREPARE_ARG_NAMES, key)))
+        self._flush_stream_buffers()
+        self._prepare_key = key
+
+        self._cache_prompt_embeds(self._embed_key(key), inner.prompt_embeds)
+
+    def _only_prompt_changed(self, key: Tuple[Any, ...]) -> bool:
+        """判断与上次 prepare 相比是否只有提示词发生了变化"""
+        return self._prepare_key is not None and self._prepare_key[2:] == key[2:]
+
+    def _embed_key(self, key: Tuple[Any, ...]) -> bytes:
+        """
+        文本 embedding 的缓存键
+
+        启用 CFG 且 guidance_scale > 1 时 embedding 中拼接了 uncond 部分，形状不同，需要区分；
+        提示词可能很长，用定长摘要作为键以限制缓存占用的内存。
+        """
+        prompt, negative_prompt, _, guidance_scale, _ = key
+        inner = getattr(self.stream, "stream", None)
+        with_uncond = getattr(inner, "cfg_type", None) != "none" and guidance_scale > 1.0
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(prompt.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(negative_prompt.encode("utf-8"))
+        digest.update(b"\1" if with_uncond else b"\0")
+        return digest.digest()
+
+    def _update_prompt_embeds(self, key: Tuple[Any, ...]) -> bool:
+        """
+        只更新提示词 embedding（命中缓存时不运行文本编码器）
+
+        Returns:
+            是否成功更新；返回 False 时需要走完整的 prepare
+        """
+        inner = getattr(self.stream, "stream", None)
+        embed_key = self._embed_key(key)
+        embeds = self._embed_cache.get(embed_key)
+        if embeds is not None:
+            self._embed_cache.move_to_end(embed_key)
+            inner.prompt_embeds = embeds
+        elif getattr(inner, "cfg_type", None) == "none":
+            inner.update_prompt(key[0])
+            self._cache_prompt_embeds(embed_key, inner.prompt_embeds)
+        else:
+            # 启用 CFG 时 embedding 中还包含 uncond 部分，未命中缓存只能走完整 prepare
+            return False
+
+        self._flush_stream_buffers()
+        return True
+
+    def _cache_prompt_embeds(self, key: bytes, embeds: torch.Tensor) -> None:
+        """缓存提示词 embedding（LRU，最多 _EMBED_CACHE_SIZE 条）"""
+        self._embed_cache[key] = embeds
+        self._embed_cache.move_to_end(key)
+        while len(self._embed_cache) > _EMBED_CACHE_SIZE:
+            self._embed_cache.popitem(last=False)
+
+    @no_autograd
+    def _flush_stream_buffers(self) -> None:
+        """清空流内部的批处理缓冲，避免参数切换后继续输出旧帧"""
+        inner = getattr(self.stream, "stream", None)
+        latent_buffer = getattr(inner, "x_t_latent_buffer", None)
+        if latent_buffer is not None:
+            latent_buffer.zero_()
+        # 参数已变化，上一帧输出不再可复用
+        self._last_outputs.clear()
+
+    def _should_drop_frame(self, params: InputParams) -> bool:
+        """
+        判断当前帧是否已过期且应被丢弃
+
+        帧的接收时间（ts，time.monotonic）距今超过阈值，并且输入队列中
+        已经有更新的帧时，丢弃当前帧以保证实时延迟不累积。
+        """
+        if self._stale_frame_threshold <= 0 or getattr(params, "session_id", None) not in self._last_outputs:
+            return False
+
+        ts = getattr(params, "ts", None)
+        if ts is None or time.monotonic() - ts <= self._stale_frame_threshold:
+            return False
+
+        newer_frame_available = getattr(params, "newer_frame_available", None)
+        return callable(newer_frame_available) and bool(newer_frame_available())
 
     def _ensure_stream(self, params: InputParams) -> None:
         """确保使用正确的流（处理 LoRA 切换）"""
@@ -241,15 +706,43 @@ class StreamDiffusionBasePipeline(BasePipeline):
 
         self.logger.info("Switching LoRA selection to %s", selection)
 
-        # 只有在真正切换LoRA时才清理旧的stream资源
-        if hasattr(self, 'stream') and self.stream is not None:
-            self._cleanup_stream_resources()
-
-        self.stream = self._create_stream(params)
-        self._prepare_cache = {}
+        # 当前流连同其参数状态放回缓存
+        if getattr(self, 'stream', None) is not None:
+            self._stream_cache[self._active_lora] = _StreamEntry(
+                self.stream, self._prepare_key, self._embed_cache, self._frame_buffer_size
+            )
+            self.stream = None
+            self._bind_stream()
+
+        entry = self._stream_cache.pop(selection, None)
+        if entry is not None:
+            self.logger.info("复用已缓存的流: %s", selection)
+            self.stream = entry.stream
+            self._prepare_key = entry.prepare_key
+            self._embed_cache = entry.embed_cache
+            self._frame_buffer_size = entry.frame_buffer_size
+            self._flush_stream_buffers()
+        else:
+            # 先释放旧流再构建新流，保证加上新流后不超过缓存上限，避免显存峰值翻倍
+            self._evict_streams(self._stream_cache_size - 1)
+            try:
+                self.stream = self._create_stream(params)
+            except torch.cuda.OutOfMemoryError:
+                if not self._stream_cache:
+                    raise
+                self.logger.warning("构建新流时显存不足，释放所有缓存的流后重试")
+                self._evict_streams(0)
+                self.stream = self._create_stream(params)
+            self._prepare_key = None
+            self._embed_cache = OrderedDict()
+        self._bind_stream()
         self._active_lora = selection
 
-    def predict(self, params: InputParams) -> Image.Image:
+    def _bind_stream(self) -> None:
+        """当前流变化（创建、切换或释放）后调用，子类可在此预先解析与流相关的方法"""
+
+    @no_autograd
+    def predict(self, params: InputParams) -> torch.Tensor:
         """
         执行预测
 
@@ -257,19 +750,132 @@ class StreamDiffusionBasePipeline(BasePipeline):
             params: 输入参数
 
         Returns:
-            生成的图像
+            生成的图像张量 (C, H, W)，取值范围 [0, 1]
         """
         self._ensure_stream(params)
         self._prepare_if_needed(params)
 
+        stale_output = self._reuse_stale_output(params)
+        if stale_output is not None:
+            return stale_output
+
         # 预处理输入图像（由子类实现）
         image_tensor = self._preprocess_input_image(params)
 
-        # 执行生成
-        output_image = self.stream(image=image_tensor, prompt=params.prompt)
+        # 执行生成（提示词已在 _prepare_if_needed 中生效，不再逐帧重新编码）
+        output_image = self.stream(image=image_tensor)
+        self._remember_last_output(params, output_image)
 
         return output_image
 
+    def _reuse_stale_output(self, params: InputParams) -> Optional[torch.Tensor]:
+        """帧已过期时返回本会话的上一帧输出（需在 prepare 之后调用），否则返回 None"""
+        if not self._should_drop_frame(params):
+            return None
+        self._dropped_frames += 1
+        if self._dropped_frames % 100 == 0:
+            self.logger.debug("Dropped %d stale frames", self._dropped_frames)
+        return self._last_outputs[getattr(params, "session_id", None)]
+
+    def _remember_last_output(self, params: InputParams, output_image: torch.Tensor) -> None:
+        """按会话记录上一帧输出（params 不带 session_id 时归入 None）"""
+        session_id = getattr(params, "session_id", None)
+        self._last_outputs[session_id] = output_image
+        self._last_outputs.move_to_end(session_id)
+        while len(self._last_outputs) > _LAST_OUTPUT_SESSIONS:
+            self._last_outputs.popitem(last=False)
+
+    @no_autograd
+    def prewarm(self) -> None:
+        """
+        以目标分辨率执行一次空白帧推理，提前固定缓存分配器的显存段布局
+
+        reuse_warmup 跳过构建时的 warmup 后，重新加载的管道在首帧才按稳态形状分配显存；
+        预先跑一帧使之后的推理直接复用这些显存块，无需再靠 empty_cache 整理碎片。
+        启用 torch.compile 时这一帧同时完成编译与 CUDA Graph 捕获，之后才写入预热标记。
+        """
+        if self._device.type != "cuda" or self._warmed_up:
+            return
+        stream = self.stream
+        blank = torch.zeros(
+            (self._frame_buffer_size, 3, stream.height, stream.width),
+            device=self._device,
+            dtype=stream.dtype,
+        )
+        stream(image=blank)
+        # 空白帧不能混入后续真实帧的去噪批次
+        self._flush_stream_buffers()
+        self._warmed_up = True
+        if self._pending_warmup_marker is not None:
+            self._pending_warmup_marker.touch()
+            self._pending_warmup_marker = None
+
+    def _batch_key(self, params: InputParams) -> Tuple[Any, ...]:
+        """同一批次中的帧必须共享 LoRA 与 prepare 参数（与 prepare 键的归一化方式一致）"""
+        return (params.lora_selection or "none", *self._make_prepare_key(params))
+
+    @no_autograd
+    def predict_batch(self, params_list: List[InputParams]) -> List[torch.Tensor]:
+        """
+        批量执行预测（frame_buffer_size > 1 时由 FrameBatcher 调用）
+
+        与第一帧参数一致的帧合并成一个批次送入 denoising batch，
+        不足 frame_buffer_size 时重复最后一帧补齐；参数不同的帧另组批次处理。
+
+        Args:
+            params_list: 多个会话提交的输入参数
+
+        Returns:
+            与 params_list 一一对应的生成图像
+        """
+        first = params_list[0]
+        self._ensure_stream(first)
+        if self._frame_buffer_size <= 1:
+            return [self.predict(params) for params in params_list]
+
+        self._prepare_if_needed(first)
+        key = self._batch_key(first)
+        outputs: List[Optional[torch.Tensor]] = [None] * len(params_list)
+        batch_indices: List[int] = []
+        for i, params in enumerate(params_list):
+            if self._batch_key(params) != key:
+                continue
+            # 与 predict 一致：过期帧直接复用本会话的上一帧，不占用批次位置
+            stale_output = self._reuse_stale_output(params)
+            if stale_output is not None:
+                outputs[i] = stale_output
+            elif len(batch_indices) < self._frame_buffer_size:
+                batch_indices.append(i)
+
+        if batch_indices:
+            frames = [self._preprocess_input_image(params_list[i]) for i in batch_indices]
+            # frame_buffer_size > 1 时输出为 (frame_buffer_size, C, H, W) 张量
+            batch_outputs = self.stream(image=self._stack_frames(frames, self._frame_buffer_size))
+            for output_index, params_index in enumerate(batch_indices):
+                outputs[params_index] = batch_outputs[output_index]
+                self._remember_last_output(params_list[params_index], outputs[params_index])
+
+        # 参数不同的帧按其自身参数再组成批次
+        rest_indices = [i for i, output in enumerate(outputs) if output is None]
+        if rest_indices:
+            rest_outputs = self.predict_batch([params_list[i] for i in rest_indices])
+            for i, output in zip(rest_indices, rest_outputs):
+                outputs[i] = output
+        return outputs
+
+    @staticmethod
+    def _stack_frames(frames: List[torch.Tensor], batch_size: int) -> torch.Tensor:
+        """
+        把逐帧预处理结果合并为 (batch_size, C, H, W) 的批次
+
+        只收集到列表后调用一次 torch.stack，避免循环 torch.cat 的 O(n²) 拷贝；
+        不足 batch_size 时以最后一帧的引用补齐，拷贝只在 stack 中发生一次。
+        """
+        # 预处理结果形状为 (1, C, H, W)，去掉批次维
+        frames = [frame.squeeze(0) for frame in frames]
+        frames.extend([frames[-1]] * (batch_size - len(frames)))
+        return torch.stack(frames, dim=0)
+
     @abstractmethod
     def _preprocess_input_image(self, params: InputParams):
         """
@@ -285,73 +891,195 @@ class StreamDiffusionBasePipeline(BasePipeline):
         """
         pass
 
-    def _cleanup_stream_resources(self):
-        """清理StreamDiffusion相关资源"""
-        try:
-            if hasattr(self, 'stream') and self.stream is not None:
-                self.logger.info("开始清理 StreamDiffusion 资源...")
+    def _preprocess_pil_image(self, image) -> torch.Tensor:
+        """
+        把输入图像转换为 stream 需要的张量
 
-                stream = self.stream
-
-                # 清理主要组件
-                components_to_cleanup = [
-                    ('unet', 'UNet'),
-                    ('vae', 'VAE'),
-                    ('text_encoder', '文本编码器'),
-                    ('pipe', '管道'),
-                    ('image_processor', '图像处理器'),
-                    ('safety_checker', '安全检查器'),
-                    ('feature_extractor', '特征提取器')
-                ]
-
-                for attr_name, display_name in components_to_cleanup:
-                    if hasattr(stream, attr_name):
-                        try:
-                            delattr(stream, attr_name)
-                            self.logger.debug(f"{display_name} 已清理")
-                        except Exception as e:
-                            self.logger.warning(f"清理 {display_name} 失败: {e}")
-
-                # 清理 ControlNet 处理器
-                if hasattr(stream, 'controlnet_processors'):
-                    for name, processor in stream.controlnet_processors.items():
-                        try:
-                            if hasattr(processor, 'model'):
-                                delattr(processor, 'model')
-                            if hasattr(processor, 'device'):
-                                delattr(processor, 'device')
-                            self.logger.debug(f"ControlNet 处理器 {name} 已清理")
-                        except Exception as e:
-                            self.logger.warning(f"清理 ControlNet 处理器 {name} 失败: {e}")
-                    delattr(stream, 'controlnet_processors')
-                    self.logger.debug("ControlNet 处理器字典已清理")
-
-                # 删除 stream 对象
-                delattr(self, 'stream')
-                self.logger.debug("StreamDiffusion 对象已清理")
+        绝大多数帧已经是目标尺寸的 RGB 图像，此时以 uint8 上传到设备后再归一化，
+        跳过 wrapper.preprocess_image 中 convert("RGB")、resize 和 CPU 上的浮点转换。
+        """
+        stream = self.stream
+        if (
+            isinstance(image, Image.Image)
+            and image.mode == "RGB"
+            and image.size == (stream.width, stream.height)
+        ):
+            pixels = self._upload(np.asarray(image))
+            # HWC uint8 -> (1, C, H, W)，与 VaeImageProcessor 一致归一化到 [-1, 1]
+            tensor = pixels.permute(2, 0, 1).unsqueeze(0).to(dtype=stream.dtype)
+            return tensor.mul_(1 / 127.5).sub_(1.0)
+        return stream.preprocess_image(image)
+
+    def _upload(self, array: np.ndarray) -> torch.Tensor:
+        """
+        把主机上的 uint8 图像数组（HWC）上传到设备
 
-                # 清理缓存属性，但保留核心设备属性
-                for attr_name in ['_prepare_cache']:
-                    if hasattr(self, attr_name):
-                        delattr(self, attr_name)
+        CUDA 上经常驻的锁页缓冲做异步拷贝，避免逐帧分配和可分页内存的同步拷贝。
+        返回的设备缓冲会被下一帧覆盖，调用方需在此之前转换出新的张量。
+        吞吐优先模式下拷贝在独立 stream 上进行，当前计算 stream 通过事件等待拷贝完成。
+        """
+        if self._device.type != "cuda":
+            return torch.from_numpy(np.array(array, dtype=np.uint8)).to(self._device)
+
+        if self._h_buf is None or self._h_buf.shape != array.shape:
+            self._h_buf = torch.empty(array.shape, dtype=torch.uint8, pin_memory=True)
+            self._d_buf = torch.empty_like(self._h_buf, device=self._device)
+        elif self._upload_done is not None:
+            # 上一帧的异步拷贝完成前不能覆盖锁页缓冲
+            self._upload_done.synchronize()
+
+        np.copyto(self._h_buf.numpy(), array)
+        self._upload_done = torch.cuda.Event()
+
+        if self._upload_stream is None:
+            self._d_buf.copy_(self._h_buf, non_blocking=True)
+            self._upload_done.record()
+            return self._d_buf
+
+        # 上一帧可能仍在读取常驻设备缓冲，这里每帧分配新的设备张量（缓存分配器复用显存）
+        compute_stream = torch.cuda.current_stream(self._device)
+        with torch.cuda.stream(self._upload_stream):
+            device_tensor = self._h_buf.to(self._device, non_blocking=True)
+            self._upload_done.record(self._upload_stream)
+        compute_stream.wait_event(self._upload_done)
+        device_tensor.record_stream(compute_stream)
+        return device_tensor
+
+    @no_autograd
+    def prepare(self, prompt: str = "", **kwargs):
+        """
+        预处理和 warmup
 
-                # 强制垃圾回收和GPU缓存清理
-                import gc
-                import torch
+        Args:
+            prompt: 初始提示词
+            **kwargs: 其他参数
+        """
+        # 以缓存的初始参数为模板（InputParams 不可变，通过 model_copy 覆盖参数）
+        updates = {key: value for key, value in kwargs.items() if key in self.InputParams.model_fields}
+        if prompt:
+            updates["prompt"] = prompt
+
+        self._prepare_if_needed(self._initial_params.model_copy(update=updates))
+
+    @classmethod
+    def get_info(cls) -> BasePipeline.Info:
+        """获取管道元信息（静态内容，按类缓存）"""
+        if "_info" not in cls.__dict__:
+            cls._info = cls.Info()
+        return cls._info
+
+    @classmethod
+    def get_input_params_schema(cls) -> dict:
+        """
+        获取输入参数的 JSON Schema（由 InputParams 静态决定，按类缓存）
+
+        返回的是各调用方共享的缓存对象，应视为只读；需要修改时请先 copy.deepcopy。
+        """
+        # 只查 cls.__dict__，子类不会拿到父类的缓存
+        if "_input_params_schema" not in cls.__dict__:
+            cls._input_params_schema = cls._build_input_params_schema()
+        return cls._input_params_schema
+
+    @classmethod
+    def _build_input_params_schema(cls) -> dict:
+        """把 Pydantic 生成的 JSON Schema 转换为前端需要的格式"""
+        # 使用 Pydantic 的 schema 生成功能
+        schema = cls.InputParams.model_json_schema()
+
+        # 转换为前端需要的格式
+        properties = {}
+        for field_name, field_info in schema.get("properties", {}).items():
+            # 跳过隐藏字段
+            if field_info.get("hide", False):
+                continue
+
+            properties[field_name] = {
+                "default": field_info.get("default", ""),
+                "title": field_info.get("title", field_name),
+                "id": field_name,
+                "type": field_info.get("type", "string"),
+                "description": field_info.get("description", ""),
+            }
+
+            # 添加范围字段
+            if "minimum" in field_info:
+                properties[field_name]["min"] = field_info["minimum"]
+            if "maximum" in field_info:
+                properties[field_name]["max"] = field_info["maximum"]
+
+            # 根据类型设置 field 类型
+            if field_info.get("type") == "number":
+                properties[field_name]["field"] = "range"
+            elif field_info.get("type") == "integer":
+                if field_name == "seed":
+                    properties[field_name]["field"] = "input"
+                else:
+                    properties[field_name]["field"] = "range"
+            elif field_name in ["prompt", "negative_prompt"]:
+                properties[field_name]["field"] = "textarea"
+            else:
+                properties[field_name]["field"] = "input"
+
+            # 处理选择字段
+            if field_name == "lora_selection" and "values" in field_info:
+                properties[field_name]["values"] = field_info["values"]
+
+        return {
+            "properties": properties
+        }
 
-                collected = gc.collect()
-                self.logger.info(f"垃圾回收释放了 {collected} 个对象")
+    def _evict_streams(self, keep: int) -> None:
+        """按最久未用顺序释放缓存的流，直到只剩 keep 个"""
+        released = []
+        while len(self._stream_cache) > max(0, keep):
+            evicted_lora, evicted_entry = self._stream_cache.popitem(last=False)
+            self.logger.info("淘汰缓存的流: %s", evicted_lora)
+            released.append(self._release_stream(evicted_entry.stream))
+            del evicted_entry
+        if released:
+            self._free_gpu_memory()
+            self._check_streams_released(released)
+
+    def _release_stream(self, stream) -> "weakref.ReferenceType":
+        """
+        释放单个流
 
-                if torch.cuda.is_available():
-                    try:
+        模型权重随流对象的引用计数归零而释放，无需逐个删除组件；
+        调用方丢弃自身引用后，可用返回的弱引用确认流确实已被回收。
+        """
+        # 持有原生资源的 TensorRT 引擎需要显式销毁
+        engine = getattr(stream, "trt_engine", None)
+        if engine is not None and hasattr(engine, "destroy"):
+            engine.destroy()
+        return weakref.ref(stream)
+
+    def _check_streams_released(self, refs: List["weakref.ReferenceType"]) -> None:
+        """垃圾回收后检查流是否仍被引用（仍被引用时显存不会释放）"""
+        leaked = sum(1 for ref in refs if ref() is not None)
+        if leaked:
+            self.logger.warning(f"{leaked} 个 StreamDiffusion 对象仍被引用，显存未能释放")
+
+    def _free_gpu_memory(self) -> None:
+        """强制垃圾回收和GPU缓存清理（一次同步即可，不重复阻塞设备）"""
+        import gc
+
+        collected = gc.collect()
+        self.logger.info(f"垃圾回收释放了 {collected} 个对象")
+
+        # 只在管道所用的 GPU 上操作，避免在 cuda:0 上意外创建 CUDA 上下文
+        if self._device.type == "cuda":
+            try:
+                with torch.cuda.device(self._device):
+                    log_memory = self.logger.isEnabledFor(logging.INFO)
+                    if log_memory:
                         before_memory = torch.cuda.memory_allocated()
                         before_reserved = torch.cuda.memory_reserved()
 
-                        for i in range(3):
-                            torch.cuda.empty_cache()
-                            torch.cuda.synchronize()
-                            gc.collect()
+                    torch.cuda.synchronize()
+                    torch.cuda.empty_cache()
+                    torch.cuda.ipc_collect()
 
+                    if log_memory:
                         after_memory = torch.cuda.memory_allocated()
                         after_reserved = torch.cuda.memory_reserved()
 
@@ -361,8 +1089,37 @@ class StreamDiffusionBasePipeline(BasePipeline):
                         self.logger.info(f"GPU 内存清理完成: 已分配释放 {freed_allocated:.2f}GB, 已保留释放 {freed_reserved:.2f}GB")
                         self.logger.info(f"当前 GPU 内存: 已分配 {after_memory / 1024**3:.2f}GB, 已保留 {after_reserved / 1024**3:.2f}GB")
 
-                    except Exception as e:
-                        self.logger.error(f"清理 GPU 内存时出错: {e}")
+            except Exception as e:
+                self.logger.error(f"清理 GPU 内存时出错: {e}")
+
+    def _cleanup_stream_resources(self):
+        """清理StreamDiffusion相关资源（当前流及缓存中的流）"""
+        try:
+            cached_entries = list(getattr(self, '_stream_cache', {}).values())
+            has_stream = getattr(self, 'stream', None) is not None
+            if has_stream or cached_entries:
+                self.logger.info("开始清理 StreamDiffusion 资源...")
+
+                released = []
+                if has_stream:
+                    released.append(self._release_stream(self.stream))
+                    # 删除 stream 对象
+                    delattr(self, 'stream')
+                    self._bind_stream()
+                    self.logger.debug("StreamDiffusion 对象已清理")
+
+                released.extend(self._release_stream(entry.stream) for entry in cached_entries)
+                cached_entries.clear()
+                self._stream_cache.clear()
+
+                # 清理缓存属性，但保留核心设备属性
+                for attr_name in ['_prepare_key', '_embed_cache']:
+                    if hasattr(self, attr_name):
+                        delattr(self, attr_name)
+                self._h_buf = self._d_buf = self._upload_done = None
+
+                self._free_gpu_memory()
+                self._check_streams_released(released)
 
                 self.logger.info("StreamDiffusion 资源清理完成")
 
@@ -4,11 +4,14 @@
 基于 StreamDiffusionBasePipeline，专注于纯文本到图像的生成。
 """
 
-from typing import Any, Dict
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Dict, Optional, Tuple
 
+import torch
 from pydantic import BaseModel, Field
 
-from app.pipelines.streamdiffusion_base import StreamDiffusionBasePipeline
+from app.pipelines.streamdiffusion_base import StreamDiffusionBasePipeline, no_autograd
 from app.config import get_config
 
 
@@ -79,11 +82,20 @@ class Pipeline(StreamDiffusionBasePipeline):
             field="range",
         )
 
+    def __init__(self, args: Dict[str, Any], device: torch.device, torch_dtype: torch.dtype):
+        # 输出缓存：参数完全相同且流已稳定时直接复用生成结果，跳过去噪
+        self._output_cache: "OrderedDict[Tuple[Any, ...], torch.Tensor]" = OrderedDict()
+        self._output_cache_size = max(0, int(args.get("output_cache_size", 0)))
+        self._output_key: Optional[Tuple[Any, ...]] = None
+        self._output_streak = 0
+        super().__init__(args, device, torch_dtype)
+
     def _get_initial_params(self) -> "Pipeline.InputParams":
         """获取 txt2img 特定的初始参数"""
         config = get_config()
         txt2img_gen = config.txt2img_generation
-        return self.InputParams(
+        # 配置来源可信，跳过 Pydantic 校验直接构造
+        return self.InputParams.model_construct(
             prompt=txt2img_gen.prompt,
             negative_prompt=txt2img_gen.negative_prompt,
             width=txt2img_gen.width,
@@ -124,6 +136,20 @@ class Pipeline(StreamDiffusionBasePipeline):
         # 返回 None 或适当的占位符
         return None
 
+    def _bind_stream(self) -> None:
+        """按当前流预先解析生成方法，predict 中不再逐帧 hasattr 判断"""
+        stream = getattr(self, "stream", None)
+        if stream is None:
+            # 不持有已释放流的绑定方法，否则流无法被回收
+            self._generate_fn = None
+        elif hasattr(stream, "txt2img"):
+            # 使用专用的 txt2img 方法
+            self._generate_fn = stream.txt2img
+        else:
+            # 使用通用的 generate 方法，明确指定无输入图像
+            self._generate_fn = partial(stream.generate_image, input_image=None)
+
+    @no_autograd
     def predict(self, params: "Pipeline.InputParams"):
         """
         执行 txt2img 生成
@@ -135,100 +161,55 @@ class Pipeline(StreamDiffusionBasePipeline):
             生成的图像
         """
         self._ensure_stream(params)
+        # 负面提示词等由 _prepare_if_needed 写入流中
         self._prepare_if_needed(params)
 
-        # 对于 txt2img，直接调用流而不提供图像
-        # StreamDiffusionWrapper 应该处理 txt2img 模式
-        if hasattr(self.stream, 'txt2img'):
-            # 使用专用的 txt2img 方法
-            output_image = self.stream.txt2img(
-                prompt=params.prompt,
-                num_inference_steps=params.num_inference_steps,
-                guidance_scale=params.guidance_scale,
-                seed=params.seed if params.seed >= 0 else None
-            )
-        else:
-            # 使用通用的 generate 方法
-            output_image = self.stream.generate_image(
-                prompt=params.prompt,
-                input_image=None,  # 明确指定无输入图像
-                negative_prompt=params.negative_prompt,
-                num_inference_steps=params.num_inference_steps,
-                guidance_scale=params.guidance_scale,
-                seed=params.seed if params.seed >= 0 else None
+        key = None
+        # seed < 0 表示每帧随机，输出不可复用
+        if self._output_cache_size and params.seed >= 0:
+            key = (
+                self._active_lora,
+                self._prepare_key,
+                params.guidance_scale,
+                params.num_inference_steps,
+                params.seed,
+                params.width,
+                params.height,
             )
+            cached = self._output_cache.get(key)
+            if cached is not None:
+                self._output_cache.move_to_end(key)
+                return cached
+
+        output_image = self._generate_fn(
+            prompt=params.prompt,
+            num_inference_steps=params.num_inference_steps,
+            guidance_scale=params.guidance_scale,
+            seed=params.seed if params.seed >= 0 else None,
+        )
 
+        if key is not None:
+            self._remember_output(key, output_image)
         return output_image
 
-    def prepare(self, prompt: str = "", **kwargs):
-        """
-        预处理和 warmup
-
-        Args:
-            prompt: 初始提示词
-            **kwargs: 其他参数
-        """
-        # 使用默认参数创建初始准备
-        initial_params = self._get_initial_params()
-        if prompt:
-            initial_params.prompt = prompt
-
-        # 更新其他参数
-        for key, value in kwargs.items():
-            if hasattr(initial_params, key):
-                setattr(initial_params, key, value)
-
-        self._prepare_if_needed(initial_params)
-
-    @classmethod
-    def get_info(cls) -> "Pipeline.Info":
-        """获取管道元信息"""
-        return cls.Info()
-
-    @classmethod
-    def get_input_params_schema(cls) -> dict:
-        """获取输入参数的 JSON Schema"""
-        # 使用 Pydantic 的 schema 生成功能
-        schema = cls.InputParams.model_json_schema()
-
-        # 转换为前端需要的格式
-        properties = {}
-        for field_name, field_info in schema.get("properties", {}).items():
-            # 跳过隐藏字段
-            if field_info.get("hide", False):
-                continue
-
-            properties[field_name] = {
-                "default": field_info.get("default", ""),
-                "title": field_info.get("title", field_name),
-                "id": field_name,
-                "type": field_info.get("type", "string"),
-                "description": field_info.get("description", ""),
-            }
-
-            # 添加范围字段
-            if "minimum" in field_info:
-                properties[field_name]["min"] = field_info["minimum"]
-            if "maximum" in field_info:
-                properties[field_name]["max"] = field_info["maximum"]
-
-            # 根据类型设置 field 类型
-            if field_info.get("type") == "number":
-                properties[field_name]["field"] = "range"
-            elif field_info.get("type") == "integer":
-                if field_name == "seed":
-                    properties[field_name]["field"] = "input"
-                else:
-                    properties[field_name]["field"] = "range"
-            elif field_name in ["prompt", "negative_prompt"]:
-                properties[field_name]["field"] = "textarea"
-            else:
-                properties[field_name]["field"] = "input"
-
-            # 处理选择字段
-            if field_name == "lora_selection" and "values" in field_info:
-                properties[field_name]["values"] = field_info["values"]
-
-        return {
-            "properties": properties
-        }
\ No newline at end of file
+    def _remember_output(self, key: Tuple[Any, ...], output_image) -> None:
+        """流稳定后缓存输出（同一参数下初始噪声固定，输出不再变化）"""
+        if key != self._output_key:
+            self._output_key = key
+            self._output_streak = 0
+        self._output_streak += 1
+
+        # 去噪批处理下参数变化后，需经过 denoising_steps_num 帧输出才完全对应新参数
+        inner = getattr(self.stream, "stream", None)
+        if self._output_streak <= getattr(inner, "denoising_steps_num", 1):
+            return
+
+        self._output_cache[key] = output_image
+        while len(self._output_cache) > self._output_cache_size:
+            self._output_cache.popitem(last=False)
+
+    def _cleanup_stream_resources(self):
+        """清理流资源前先释放缓存的输出张量"""
+        self._output_cache.clear()
+        self._output_key = None
+        super()._cleanup_stream_resources()
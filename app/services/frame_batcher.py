@@ -0,0 +1,94 @@
+"""
+并发帧的微批处理
+
+在很短的时间窗口内收集多个会话提交的帧，一次性交给 ``pipeline.predict_batch``，
+让 StreamDiffusion 的去噪批处理（``frame_buffer_size > 1``）分摊 UNet 调用开销。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class FrameBatcher:
+    """在 ``max_wait`` 秒内最多收集 ``max_batch_size`` 帧组成一个批次"""
+
+    def __init__(
+        self,
+        predict_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int,
+        max_wait: float = 0.005,
+    ) -> None:
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be positive")
+        self._predict_batch = predict_batch
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # 已从队列取出、尚未返回结果的帧（收集中或正在生成），close 时需一并取消
+        self._inflight: List[Tuple[Any, asyncio.Future]] = []
+
+    async def submit(self, params: Any) -> Any:
+        """提交一帧并等待其生成结果"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((params, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        self._inflight = items = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._max_wait
+        while len(items) < self._max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return items
+
+    async def _run(self) -> None:
+        while True:
+            items = await self._collect()
+            try:
+                outputs = await asyncio.to_thread(
+                    self._predict_batch, [params for params, _ in items]
+                )
+            except Exception as exc:
+                logger.error(f"批量生成失败: {exc}")
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(exc)
+                self._inflight = []
+                continue
+
+            for (_, future), output in zip(items, outputs):
+                if not future.done():
+                    future.set_result(output)
+            self._inflight = []
+
+    def close(self) -> None:
+        """停止批处理任务，并取消仍在排队或正在处理的帧"""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        for _, future in self._inflight:
+            if not future.done():
+                future.cancel()
+        self._inflight = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+            self._queue = None
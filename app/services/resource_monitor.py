@@ -9,12 +9,14 @@ import time
 import logging
 import threading
 import asyncio
-import psutil
-import subprocess
-from typing import Dict, List, Optional, Set
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 from contextlib import contextmanager
 
-import torch
+if TYPE_CHECKING:
+    import psutil
+
+# multiprocessing 子进程的进程名前缀（PyTorch 会把主线程改名为 pt_main_thread）
+_PYTHON_NAME_PREFIXES = ("python", "pt_main_thread")
 
 
 class ResourceMonitor:
@@ -26,7 +28,21 @@ class ResourceMonitor:
         self.logger = logging.getLogger(__name__)
         self._running = False
         self._monitor_thread: Optional[threading.Thread] = None
+        self._monitor_task: Optional[asyncio.Task] = None
+        # stop_monitoring 通过该事件立即唤醒监控线程
+        self._stop_event = threading.Event()
+        # 未触发阈值时检查间隔逐次翻倍，直到上限
+        self._sleep = check_interval
+        self._max_sleep = 300
         self._tracked_pids: Set[int] = set()
+        # (pid, create_time) -> multiprocessing 进程信息（非 multiprocessing 进程为 None），只对新进程读取 cmdline
+        self._proc_cache: Dict[Tuple[int, float], Optional[Dict]] = {}
+        # 监控线程与 HTTP 状态查询可能同时扫描进程
+        self._proc_cache_lock = threading.Lock()
+        # NVML 句柄：首次查询 GPU 时初始化，失败时回退到 nvidia-smi
+        self._nvml = None
+        self._nvml_handle = None
+        self._nvml_unavailable = False
 
         # 资源阈值配置
         self.gpu_memory_threshold_gb = 20.0  # GPU内存超过20GB时触发清理
@@ -34,35 +50,76 @@ class ResourceMonitor:
         self.system_memory_threshold_percent = 85.0  # 系统内存使用率超过85%时触发清理
 
     def start_monitoring(self):
-        """启动资源监控"""
+        """启动资源监控（有运行中的事件循环时作为 asyncio 任务运行，否则使用后台线程）"""
         if self._running:
             self.logger.warning("资源监控已在运行中")
             return
 
         self._running = True
-        self._monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
-        self._monitor_thread.start()
+        self._stop_event.clear()
+        self._sleep = self.check_interval
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is not None:
+            self._monitor_task = loop.create_task(self._monitor_loop_async())
+        else:
+            self._monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
+            self._monitor_thread.start()
         self.logger.info(f"资源监控已启动，检查间隔: {self.check_interval}秒")
 
     def stop_monitoring(self):
         """停止资源监控"""
         self._running = False
+        self._stop_event.set()
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            self._monitor_task = None
         if self._monitor_thread:
             self._monitor_thread.join(timeout=5)
+            self._monitor_thread = None
+        self._shutdown_nvml()
         self.logger.info("资源监控已停止")
 
+    async def _monitor_loop_async(self):
+        """事件循环中的监控任务：资源扫描放到工作线程，等待期间不占用线程"""
+        while self._running:
+            try:
+                threshold_exceeded = await asyncio.to_thread(self._check_resources)
+            except Exception as e:
+                self.logger.error(f"资源监控过程中发生错误: {e}")
+                threshold_exceeded = True
+
+            await asyncio.sleep(self._next_sleep(threshold_exceeded))
+
     def _monitor_loop(self):
-        """监控循环"""
+        """监控循环（无事件循环时使用的后台线程版本）"""
         while self._running:
             try:
-                self._check_resources()
-                time.sleep(self.check_interval)
+                threshold_exceeded = self._check_resources()
             except Exception as e:
                 self.logger.error(f"资源监控过程中发生错误: {e}")
-                time.sleep(self.check_interval)
+                threshold_exceeded = True
+
+            if self._stop_event.wait(self._next_sleep(threshold_exceeded)):
+                break
+
+    def _next_sleep(self, threshold_exceeded: bool) -> float:
+        """资源正常时逐步拉长检查间隔，超过阈值时恢复为 check_interval"""
+        if threshold_exceeded:
+            self._sleep = self.check_interval
+        else:
+            self._sleep = min(self._sleep * 2, max(self._max_sleep, self.check_interval))
+        return self._sleep
+
+    def _check_resources(self) -> bool:
+        """检查资源使用情况，返回是否有任一项超过阈值"""
+        import psutil
+        import torch
+        threshold_exceeded = False
 
-    def _check_resources(self):
-        """检查资源使用情况"""
         # 检查GPU内存
         if torch.cuda.is_available():
             gpu_info = self._get_gpu_info()
@@ -73,6 +130,7 @@ class ResourceMonitor:
                 self.logger.debug(f"GPU内存使用: {memory_usage_gb:.2f}GB ({memory_usage_percent:.1f}%)")
 
                 if memory_usage_gb > self.gpu_memory_threshold_gb:
+                    threshold_exceeded = True
                     self.logger.warning(f"GPU内存使用过高: {memory_usage_gb:.2f}GB > {self.gpu_memory_threshold_gb}GB")
                     if self.auto_cleanup:
                         self._cleanup_gpu_memory()
@@ -85,6 +143,7 @@ class ResourceMonitor:
             self.logger.debug(f"发现 {mp_count} 个multiprocessing进程")
 
         if mp_count > self.multiprocessing_threshold:
+            threshold_exceeded = True
             self.logger.warning(f"multiprocessing进程数过多: {mp_count} > {self.multiprocessing_threshold}")
             if self.auto_cleanup:
                 self._cleanup_orphaned_processes(mp_processes)
@@ -94,12 +153,59 @@ class ResourceMonitor:
         memory_percent = memory.percent
 
         if memory_percent > self.system_memory_threshold_percent:
+            threshold_exceeded = True
             self.logger.warning(f"系统内存使用率过高: {memory_percent:.1f}% > {self.system_memory_threshold_percent}%")
             if self.auto_cleanup:
                 self._cleanup_system_memory()
 
+        return threshold_exceeded
+
+    def _get_nvml_handle(self):
+        """获取 GPU 0 的 NVML 句柄（只初始化一次），不可用时返回 None"""
+        if self._nvml_handle is not None or self._nvml_unavailable:
+            return self._nvml_handle
+
+        try:
+            import pynvml
+            pynvml.nvmlInit()
+            self._nvml_handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+            self._nvml = pynvml
+        except Exception as e:
+            self._nvml_unavailable = True
+            self.logger.debug(f"NVML 不可用，改用 nvidia-smi 查询GPU信息: {e}")
+        return self._nvml_handle
+
+    def _shutdown_nvml(self):
+        """释放 NVML，下次查询时重新初始化"""
+        if self._nvml is None:
+            return
+        try:
+            self._nvml.nvmlShutdown()
+        except Exception as e:
+            self.logger.debug(f"关闭 NVML 时出错: {e}")
+        self._nvml = None
+        self._nvml_handle = None
+
     def _get_gpu_info(self) -> Optional[Dict]:
         """获取GPU信息"""
+        handle = self._get_nvml_handle()
+        if handle is not None:
+            try:
+                memory = self._nvml.nvmlDeviceGetMemoryInfo(handle)
+                return {
+                    'total': memory.total >> 20,  # MB
+                    'used': memory.used >> 20,    # MB
+                    'free': memory.free >> 20,    # MB
+                }
+            except Exception as e:
+                self.logger.debug(f"NVML 查询GPU信息失败: {e}")
+                return None
+
+        return self._get_gpu_info_from_smi()
+
+    def _get_gpu_info_from_smi(self) -> Optional[Dict]:
+        """通过 nvidia-smi 获取GPU信息（NVML 不可用时的回退路径）"""
+        import subprocess
         try:
             result = subprocess.run(
                 ['nvidia-smi', '--query-gpu=memory.total,memory.used,memory.free',
@@ -134,27 +240,58 @@ class ResourceMonitor:
 
     def _find_multiprocessing_processes(self) -> List[Dict]:
         """查找multiprocessing进程"""
+        import psutil
         mp_processes = []
+        live_keys = set()
 
-        for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'create_time', 'ppid']):
-            try:
-                cmdline = proc.info.get('cmdline', [])
-                if cmdline and any('multiprocessing' in str(arg) for arg in cmdline):
-                    mp_processes.append({
-                        'pid': proc.info['pid'],
-                        'name': proc.info['name'],
-                        'cmdline': ' '.join(cmdline),
-                        'create_time': proc.info['create_time'],
-                        'ppid': proc.info['ppid'],
-                        'process_obj': proc
-                    })
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
+        with self._proc_cache_lock:
+            for proc in psutil.process_iter(['pid', 'name', 'create_time', 'ppid']):
+                info = proc.info
+                key = (info['pid'], info['create_time'])
+                live_keys.add(key)
+
+                if key not in self._proc_cache:
+                    self._proc_cache[key] = self._inspect_process(proc)
+
+                proc_info = self._proc_cache[key]
+                if proc_info is not None:
+                    # 父进程退出后 ppid 会变化，孤立进程判断依赖最新值
+                    proc_info['ppid'] = info['ppid']
+                    mp_processes.append(proc_info)
+
+            # 丢弃已退出进程的缓存
+            for key in self._proc_cache.keys() - live_keys:
+                del self._proc_cache[key]
 
         return mp_processes
 
+    def _inspect_process(self, proc: "psutil.Process") -> Optional[Dict]:
+        """读取新进程的 cmdline，判断是否为multiprocessing进程"""
+        import psutil
+        name = proc.info.get('name') or ''
+        if not name.startswith(_PYTHON_NAME_PREFIXES):
+            return None
+
+        try:
+            cmdline = proc.cmdline()
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return None
+
+        if not any('multiprocessing' in arg for arg in cmdline):
+            return None
+
+        return {
+            'pid': proc.info['pid'],
+            'name': name,
+            'cmdline': ' '.join(cmdline),
+            'create_time': proc.info['create_time'],
+            'ppid': proc.info['ppid'],
+            'process_obj': proc
+        }
+
     def _cleanup_gpu_memory(self):
         """清理GPU内存"""
+        import torch
         try:
             self.logger.info("开始清理GPU内存...")
 
@@ -163,12 +300,12 @@ class ResourceMonitor:
                 before_allocated = torch.cuda.memory_allocated()
                 before_reserved = torch.cuda.memory_reserved()
 
-                # 多次清理
-                for i in range(5):
-                    import gc
-                    gc.collect()
-                    torch.cuda.empty_cache()
+                # 清理一次即可；监控运行期间不同步设备，避免阻塞正在进行的推理
+                import gc
+                gc.collect()
+                if not self._running:
                     torch.cuda.synchronize()
+                torch.cuda.empty_cache()
 
                 # 获取清理后的状态
                 after_allocated = torch.cuda.memory_allocated()
@@ -185,6 +322,7 @@ class ResourceMonitor:
 
     def _cleanup_orphaned_processes(self, mp_processes: List[Dict]):
         """清理孤立的multiprocessing进程"""
+        import psutil
         try:
             self.logger.info("开始清理孤立的multiprocessing进程...")
 
@@ -240,6 +378,8 @@ class ResourceMonitor:
 
     def _cleanup_system_memory(self):
         """清理系统内存"""
+        import psutil
+        import torch
         try:
             self.logger.info("开始清理系统内存...")
 
@@ -261,6 +401,8 @@ class ResourceMonitor:
 
     def get_resource_status(self) -> Dict:
         """获取当前资源状态"""
+        import psutil
+        import torch
         status = {
             'timestamp': time.time(),
             'gpu': None,
@@ -317,6 +459,7 @@ class ResourceMonitor:
 
     def cleanup_tracked_processes(self):
         """清理所有被跟踪的进程"""
+        import psutil
         if not self._tracked_pids:
             return
 
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Dict, List
 
 import logging
 import torch
@@ -16,71 +16,64 @@ from app.services.session_service import SessionService
 
 logger = logging.getLogger(__name__)
 
-_canvas_service: Optional[SessionService] = None
-_realtime_service: Optional[SessionService] = None
-_txt2img_service: Optional[SessionService] = None
+# 服务名 -> SessionService，由 setup_session_services 填充（按 canvas、realtime、txt2img 顺序）
+_services: Dict[str, SessionService] = {}
 
 
-def setup_session_services(config: Config, device: torch.device, torch_dtype: torch.dtype) -> None:
-    global _canvas_service, _realtime_service, _txt2img_service
-
-    def _canvas_manager_factory() -> ConnectionManager:
-        return ConnectionManager(drain_strategy="latest", max_queue_depth=1)
+def _make_service(
+    name: str,
+    pipeline_cls: type,
+    drain_strategy: str,
+    config: dict,
+    device: torch.device,
+    torch_dtype: torch.dtype,
+) -> SessionService:
+    def _manager_factory() -> ConnectionManager:
+        return ConnectionManager(drain_strategy=drain_strategy, max_queue_depth=1)
 
-    def _realtime_manager_factory() -> ConnectionManager:
-        return ConnectionManager(drain_strategy="all", max_queue_depth=1)
+    return SessionService(
+        name=name,
+        pipeline_cls=pipeline_cls,
+        connection_manager_factory=_manager_factory,
+        config=config,
+        device=device,
+        torch_dtype=torch_dtype,
+    )
 
-    def _txt2img_manager_factory() -> ConnectionManager:
-        return ConnectionManager(drain_strategy="latest", max_queue_depth=1)
 
-    if _canvas_service is None:
-        _canvas_service = SessionService(
-            name="canvas",
-            pipeline_cls=CanvasPipeline,
-            connection_manager_factory=_canvas_manager_factory,
-            config=config.get_canvas_config(),
-            device=device,
-            torch_dtype=torch_dtype,
+def setup_session_services(config: Config, device: torch.device, torch_dtype: torch.dtype) -> None:
+    if "canvas" not in _services:
+        _services["canvas"] = _make_service(
+            "canvas", CanvasPipeline, "latest", config.get_canvas_config(), device, torch_dtype
         )
-
-    if _realtime_service is None:
-        _realtime_service = SessionService(
-            name="realtime",
-            pipeline_cls=RealtimePipeline,
-            connection_manager_factory=_realtime_manager_factory,
-            config=config.get_realtime_config(),
-            device=device,
-            torch_dtype=torch_dtype,
+    if "realtime" not in _services:
+        _services["realtime"] = _make_service(
+            "realtime", RealtimePipeline, "all", config.get_realtime_config(), device, torch_dtype
         )
-
-    if _txt2img_service is None:
-        _txt2img_service = SessionService(
-            name="txt2img",
-            pipeline_cls=Txt2ImgPipeline,
-            connection_manager_factory=_txt2img_manager_factory,
-            config=config.get_txt2img_config(),
-            device=device,
-            torch_dtype=torch_dtype,
+    if "txt2img" not in _services:
+        _services["txt2img"] = _make_service(
+            "txt2img", Txt2ImgPipeline, "latest", config.get_txt2img_config(), device, torch_dtype
         )
 
 
+def _get_service(name: str, label: str) -> SessionService:
+    try:
+        return _services[name]
+    except KeyError:
+        raise RuntimeError(f"{label} service not configured") from None
+
+
 def get_canvas_service() -> SessionService:
-    if _canvas_service is None:
-        raise RuntimeError("Canvas service not configured")
-    return _canvas_service
+    return _get_service("canvas", "Canvas")
 
 
 def get_realtime_service() -> SessionService:
-    if _realtime_service is None:
-        raise RuntimeError("Realtime service not configured")
-    return _realtime_service
+    return _get_service("realtime", "Realtime")
 
 
 def get_txt2img_service() -> SessionService:
-    if _txt2img_service is None:
-        raise RuntimeError("Txt2Img service not configured")
-    return _txt2img_service
+    return _get_service("txt2img", "Txt2Img")
 
 
 def list_services() -> List[SessionService]:
-    return [svc for svc in (_canvas_service, _realtime_service, _txt2img_service) if svc is not None]
+    return list(_services.values())
@@ -7,11 +7,15 @@ singletons or instantiate pipelines directly.
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import gc
 import logging
 import os
 import psutil
+import threading
+from collections import ChainMap
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Set
 
 import torch
 
@@ -19,8 +23,55 @@ from app.api.session_base import SessionAPI
 
 logger = logging.getLogger(__name__)
 
+# Linux 内核直接导出的子进程列表（需要 CONFIG_PROC_CHILDREN），可免去遍历整个 /proc
+_PROC_CHILDREN_AVAILABLE = os.path.exists(f"/proc/self/task/{os.getpid()}/children")
 
-@dataclass
+# 子进程按构建前后的快照差异归属到管道。/proc 可用时只统计构建线程自己创建的子进程，
+# 多个服务可以并行构建；否则只能对整个进程做快照，构建必须串行，
+# 避免把其它服务的子进程记到自己名下，在重新加载或关闭时误杀
+_construct_lock = threading.Lock()
+
+
+def _read_children_file(path: str) -> List[int]:
+    """读取 /proc/.../task/<tid>/children 中的子进程 PID"""
+    with open(path, "r") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def _read_proc_children(pid: int) -> List[int]:
+    """读取进程所有线程的直接子进程"""
+    children: List[int] = []
+    task_dir = f"/proc/{pid}/task"
+    for tid in os.listdir(task_dir):
+        try:
+            children.extend(_read_children_file(f"{task_dir}/{tid}/children"))
+        except FileNotFoundError:
+            # 线程已退出
+            continue
+    return children
+
+
+def _thread_descendant_pids() -> Set[int]:
+    """返回当前线程创建的子进程及其所有后代的 PID（/proc 不可用时退化为整个进程的后代）"""
+    if not _PROC_CHILDREN_AVAILABLE:
+        return {child.pid for child in psutil.Process().children(recursive=True)}
+
+    pending = _read_children_file(f"/proc/self/task/{threading.get_native_id()}/children")
+    descendants: Set[int] = set(pending)
+    while pending:
+        try:
+            children = _read_proc_children(pending.pop())
+        except FileNotFoundError:
+            # 进程已退出
+            continue
+        for child in children:
+            if child not in descendants:
+                descendants.add(child)
+                pending.append(child)
+    return descendants
+
+
+@dataclass(slots=True)
 class ServiceState:
     """Holds runtime objects for a concrete session service."""
 
@@ -33,6 +84,19 @@ class ServiceState:
 class SessionService:
     """Owns a pipeline instance plus its SessionAPI facade."""
 
+    __slots__ = (
+        "_name",
+        "_pipeline_cls",
+        "_connection_manager_factory",
+        "_config",
+        "_device",
+        "_torch_dtype",
+        "_session_api",
+        "_state",
+        "_persistent_overrides",
+        "_lock",
+    )
+
     def __init__(
         self,
         name: str,
@@ -58,7 +122,8 @@ class SessionService:
         async with self._lock:
             if self._state.initialized:
                 return
-            self._initialize_pipeline()
+            # 加载权重、编译引擎耗时较长，放到工作线程中执行，避免阻塞事件循环
+            await asyncio.to_thread(self._initialize_pipeline)
 
     async def shutdown(self) -> None:
         async with self._lock:
@@ -68,25 +133,34 @@ class SessionService:
 
             # 清理pipeline资源
             if self._state.pipeline is not None:
-                self._cleanup_pipeline_resources(self._state.pipeline)
+                await asyncio.to_thread(self._cleanup_pipeline_resources, self._state.pipeline, True)
 
             self._state = ServiceState()
 
     async def reload(self, overrides: Optional[Dict[str, Any]] = None, persist: bool = False) -> None:
         async with self._lock:
-            await self._session_api.shutdown_api()
             if persist and overrides:
                 self._apply_overrides(self._persistent_overrides, overrides)
-                self._initialize_pipeline()
-            else:
-                self._initialize_pipeline(ephemeral_overrides=overrides)
+                overrides = None
+
+            # 合并后的配置与当前管道一致时无需重建，避免重新加载权重
+            if (
+                self._state.initialized
+                and self._state.pipeline is not None
+                and self._merge_config(overrides) == self._state.config
+            ):
+                logger.info("%s config unchanged; skipping reload", self._name)
+                return
+
+            await self._session_api.shutdown_api(release_cache=False)
+            await asyncio.to_thread(self._initialize_pipeline, overrides)
 
     async def get_api(self) -> SessionAPI:
         if not self._state.initialized:
             logger.info(f"懒加载初始化 {self._name} 服务")
             async with self._lock:
                 if not self._state.initialized:
-                    self._initialize_pipeline()
+                    await asyncio.to_thread(self._initialize_pipeline)
         return self._session_api
 
     def get_config(self) -> Dict[str, Any]:
@@ -95,42 +169,58 @@ class SessionService:
     def get_pipeline(self) -> Any:
         return self._state.pipeline
 
+    def _merge_config(self, ephemeral_overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # 优先级：临时覆盖 > 持久覆盖 > 基础配置；临时覆盖中值为 None 的键表示删除该配置
+        # （持久覆盖在写入时已去掉 None）
+        ephemeral_overrides = ephemeral_overrides or {}
+        removed = {key for key, value in ephemeral_overrides.items() if value is None}
+        merged = ChainMap(ephemeral_overrides, self._persistent_overrides, self._config)
+        return {key: value for key, value in merged.items() if key not in removed}
+
     def _initialize_pipeline(self, ephemeral_overrides: Optional[Dict[str, Any]] = None) -> None:
         # 先清理旧的pipeline资源
         if self._state.initialized and self._state.pipeline is not None:
-            self._cleanup_pipeline_resources(self._state.pipeline)
-
-        config = dict(self._config)
-        if self._persistent_overrides:
-            self._apply_overrides(config, self._persistent_overrides)
-        if ephemeral_overrides:
-            self._apply_overrides(config, ephemeral_overrides)
+            # 紧接着要构建新管道，保留缓存分配器中的显存段供其复用
+            self._cleanup_pipeline_resources(self._state.pipeline, release_cache=False)
 
+        config = self._merge_config(ephemeral_overrides)
         logger.info("Initializing %s pipeline (model=%s)", self._name, config.get("model_id"))
 
-        # 记录初始化前的子进程
-        initial_children = set(psutil.Process().children(recursive=True))
+        # 只有退化为整个进程的快照时才需要串行构建
+        with contextlib.nullcontext() if _PROC_CHILDREN_AVAILABLE else _construct_lock:
+            # 记录初始化前的子进程
+            initial_children = _thread_descendant_pids()
 
-        pipeline = self._pipeline_cls(config, self._device, self._torch_dtype)
-        self._session_api.init_api(pipeline, config, self._connection_manager_factory)
+            pipeline = self._pipeline_cls(config, self._device, self._torch_dtype)
+
+            # 记录初始化后新增的子进程（可能是multiprocessing进程）
+            child_pids = _thread_descendant_pids() - initial_children
 
-        # 记录初始化后新增的子进程（可能是multiprocessing进程）
-        final_children = set(psutil.Process().children(recursive=True))
-        new_children = final_children - initial_children
-        child_pids = {child.pid for child in new_children}
+        # 按稳态形状预先分配显存，重新加载后复用同样的显存块
+        prewarm = getattr(pipeline, "prewarm", None)
+        if callable(prewarm):
+            prewarm()
+        self._session_api.init_api(pipeline, config, self._connection_manager_factory)
 
         if child_pids:
             logger.info(f"发现新的子进程: {child_pids}")
 
         self._state = ServiceState(pipeline=pipeline, config=config, initialized=True, child_pids=child_pids)
 
-    def _cleanup_pipeline_resources(self, pipeline: Any) -> None:
-        """清理pipeline的资源，特别是GPU相关组件"""
+    def _cleanup_pipeline_resources(self, pipeline: Any, release_cache: bool = True) -> None:
+        """
+        清理pipeline的资源，特别是GPU相关组件
+
+        Args:
+            pipeline: 要清理的管道
+            release_cache: 是否把缓存分配器中的空闲显存归还给驱动；重新加载时传 False，
+                新管道可直接复用已缓存的显存段，省去 cudaFree/cudaMalloc
+        """
         try:
             logger.info(f"开始清理 {self._name} pipeline 资源...")
 
-            # 检查是否有StreamDiffusionWrapper类型的pipeline
-            if hasattr(pipeline, 'stream'):
+            # 检查是否有StreamDiffusionWrapper类型的pipeline（当前流可能已被释放，但缓存中仍有流）
+            if hasattr(pipeline, 'stream') or hasattr(pipeline, '_stream_cache'):
                 self._cleanup_streamdiffusion_pipeline(pipeline)
 
             # 检查是否有ControlNet处理器
@@ -138,33 +228,37 @@ class SessionService:
                 self._cleanup_controlnet_processors(pipeline)
 
             # 强制垃圾回收和GPU缓存清理
-            import gc
-            import torch
-
             collected = gc.collect()
             logger.info(f"垃圾回收释放了 {collected} 个对象")
 
-            if torch.cuda.is_available():
+            # 只在管道所用的 GPU 上操作，避免在 cuda:0 上意外创建 CUDA 上下文
+            if self._device.type == "cuda":
                 try:
-                    # 获取清理前的内存状态
-                    before_memory = torch.cuda.memory_allocated()
-                    before_reserved = torch.cuda.memory_reserved()
+                    with torch.cuda.device(self._device):
+                        log_memory = logger.isEnabledFor(logging.INFO)
+                        if log_memory:
+                            before_memory = torch.cuda.memory_allocated()
+                            before_reserved = torch.cuda.memory_reserved()
 
-                    # 多次清理
-                    for i in range(3):
-                        torch.cuda.empty_cache()
+                        # 先等待所有 kernel 完成，empty_cache 才能真正归还已释放的块；清理一次即可
                         torch.cuda.synchronize()
-                        gc.collect()
-
-                    # 获取清理后的内存状态
-                    after_memory = torch.cuda.memory_allocated()
-                    after_reserved = torch.cuda.memory_reserved()
-
-                    freed_allocated = (before_memory - after_memory) / 1024**3
-                    freed_reserved = (before_reserved - after_reserved) / 1024**3
-
-                    logger.info(f"GPU 内存清理完成: 已分配释放 {freed_allocated:.2f}GB, 已保留释放 {freed_reserved:.2f}GB")
-                    logger.info(f"当前 GPU 内存: 已分配 {after_memory / 1024**3:.2f}GB, 已保留 {after_reserved / 1024**3:.2f}GB")
+                        if release_cache:
+                            torch.cuda.empty_cache()
+
+                        if log_memory:
+                            after_memory = torch.cuda.memory_allocated()
+                            after_reserved = torch.cuda.memory_reserved()
+
+                            logger.info(
+                                "GPU 内存清理完成: 已分配释放 %.2fGB, 已保留释放 %.2fGB",
+                                (before_memory - after_memory) / 1024**3,
+                                (before_reserved - after_reserved) / 1024**3,
+                            )
+                            logger.info(
+                                "当前 GPU 内存: 已分配 %.2fGB, 已保留 %.2fGB",
+                                after_memory / 1024**3,
+                                after_reserved / 1024**3,
+                            )
 
                 except Exception as e:
                     logger.error(f"清理 GPU 内存时出错: {e}")
@@ -184,24 +278,36 @@ class SessionService:
 
         logger.info(f"开始清理 {self._name} 的子进程: {self._state.child_pids}")
 
-        cleaned_count = 0
+        # 先向所有子进程发送 terminate，再统一等待，总等待时间不随进程数增长
+        procs = []
         for child_pid in list(self._state.child_pids):
             try:
                 proc = psutil.Process(child_pid)
-                if proc.is_running():
-                    logger.info(f"终止子进程: PID {child_pid}")
-                    proc.terminate()
-                    proc.wait(timeout=3)
-                    cleaned_count += 1
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.TimeoutExpired):
-                try:
-                    # 如果优雅终止失败，强制杀死
-                    proc = psutil.Process(child_pid)
-                    proc.kill()
-                    cleaned_count += 1
-                    logger.warning(f"强制终止子进程: PID {child_pid}")
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    logger.debug(f"子进程 {child_pid} 已不存在或无法访问")
+                logger.info(f"终止子进程: PID {child_pid}")
+                proc.terminate()
+                procs.append(proc)
+            except psutil.NoSuchProcess:
+                logger.debug(f"子进程 {child_pid} 已不存在")
+            except psutil.AccessDenied:
+                logger.debug(f"子进程 {child_pid} 无法访问")
+
+        gone, alive = psutil.wait_procs(procs, timeout=3)
+        cleaned_count = len(gone)
+
+        # 优雅终止超时的进程强制杀死
+        for proc in alive:
+            try:
+                proc.kill()
+                logger.warning(f"强制终止子进程: PID {proc.pid}")
+            except psutil.NoSuchProcess:
+                pass
+            except psutil.AccessDenied:
+                logger.debug(f"子进程 {proc.pid} 无法访问")
+        if alive:
+            gone, alive = psutil.wait_procs(alive, timeout=3)
+            cleaned_count += len(gone)
+            for proc in alive:
+                logger.warning(f"子进程 {proc.pid} 未能终止")
 
         self._state.child_pids.clear()
         logger.info(f"{self._name} 子进程清理完成，共处理 {cleaned_count} 个进程")
@@ -209,31 +315,64 @@ class SessionService:
     def _cleanup_streamdiffusion_pipeline(self, pipeline: Any) -> None:
         """清理StreamDiffusionWrapper类型的pipeline"""
         try:
-            stream = pipeline.stream
-
-            # 清理主要组件
-            components_to_cleanup = [
-                ('unet', 'UNet'),
-                ('vae', 'VAE'),
-                ('text_encoder', '文本编码器'),
-                ('pipe', '管道')
-            ]
-
-            for attr_name, display_name in components_to_cleanup:
-                if hasattr(stream, attr_name):
-                    try:
-                        delattr(stream, attr_name)
-                        logger.debug(f"{display_name} 已清理")
-                    except Exception as e:
-                        logger.warning(f"清理 {display_name} 失败: {e}")
-
+            stream = getattr(pipeline, 'stream', None)
+            if stream is not None:
+                self._release_stream_components(stream)
             # 删除stream对象
-            delattr(pipeline, 'stream')
+            pipeline.stream = None
+            del stream
+            # 让子类放下与流绑定的方法（如 txt2img 的 _generate_fn），否则流无法被回收
+            bind_stream = getattr(pipeline, '_bind_stream', None)
+            if callable(bind_stream):
+                bind_stream()
             logger.debug("StreamDiffusion 对象已清理")
 
+            # 释放按 LoRA 缓存的其它流
+            stream_cache = getattr(pipeline, '_stream_cache', None)
+            if stream_cache:
+                for entry in stream_cache.values():
+                    self._release_stream_components(entry.stream)
+                stream_cache.clear()
+                logger.debug("缓存的 StreamDiffusion 对象已清理")
+
         except Exception as e:
             logger.error(f"清理 StreamDiffusion pipeline 失败: {e}")
 
+    @staticmethod
+    def _release_module(owner: Any, attr_name: str) -> bool:
+        """
+        释放 owner 上的一个组件，返回是否存在该组件
+
+        nn.Module 先把参数换成 meta 张量（不拷贝数据），即使别处仍残留对模块的引用，
+        其显存也会随原存储的引用归零而释放；随后把属性置为 None。
+        """
+        module = getattr(owner, attr_name, None)
+        if module is None:
+            return False
+        if isinstance(module, torch.nn.Module):
+            module.to_empty(device="meta")
+        setattr(owner, attr_name, None)
+        return True
+
+    def _release_stream_components(self, stream: Any) -> None:
+        """释放流（包装器及其内部 StreamDiffusion）持有的模型组件"""
+        components_to_cleanup = [
+            ('unet', 'UNet'),
+            ('vae', 'VAE'),
+            ('text_encoder', '文本编码器'),
+            ('pipe', '管道')
+        ]
+
+        for owner in (stream, getattr(stream, 'stream', None)):
+            if owner is None:
+                continue
+            for attr_name, display_name in components_to_cleanup:
+                try:
+                    if self._release_module(owner, attr_name):
+                        logger.debug(f"{display_name} 已清理")
+                except Exception as e:
+                    logger.warning(f"清理 {display_name} 失败: {e}")
+
     def _cleanup_controlnet_processors(self, pipeline: Any) -> None:
         """清理ControlNet处理器"""
         try:
@@ -242,18 +381,14 @@ class SessionService:
             for name, processor in processors.items():
                 try:
                     # 清理模型的GPU引用
-                    if hasattr(processor, 'model'):
-                        delattr(processor, 'model')
-                    if hasattr(processor, 'device'):
-                        delattr(processor, 'device')
+                    self._release_module(processor, 'model')
                     logger.debug(f"ControlNet 处理器 {name} 已清理")
                 except Exception as e:
                     logger.warning(f"清理 ControlNet 处理器 {name} 失败: {e}")
 
             # 清空处理器字典
             processors.clear()
-            if hasattr(pipeline, 'controlnet_processors'):
-                delattr(pipeline, 'controlnet_processors')
+            pipeline.controlnet_processors = None
 
             logger.info("ControlNet 处理器已清理")
 
@@ -262,8 +397,7 @@ class SessionService:
 
     @staticmethod
     def _apply_overrides(target: Dict[str, Any], overrides: Dict[str, Any]) -> None:
-        for key, value in overrides.items():
-            if value is None:
-                target.pop(key, None)
-            else:
-                target[key] = value
\ No newline at end of file
+        # 值为 None 的键表示删除，其余一次性 update
+        for key in [key for key, value in overrides.items() if value is None]:
+            target.pop(key, None)
+        target.update({key: value for key, value in overrides.items() if value is not None})
\ No newline at end of file
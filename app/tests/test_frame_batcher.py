@@ -0,0 +1,42 @@
+"""
+测试 FrameBatcher 的关闭行为
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.frame_batcher import FrameBatcher
+
+
+def test_close_cancels_frames_in_slow_batch():
+    """批次生成过程中 close，等待中的 submit 应被取消而不是永久挂起"""
+
+    def slow_predict_batch(params_list):
+        time.sleep(0.3)
+        return params_list
+
+    async def scenario():
+        batcher = FrameBatcher(slow_predict_batch, max_batch_size=2)
+        task = asyncio.create_task(batcher.submit("frame"))
+        await asyncio.sleep(0.05)
+        batcher.close()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(task, timeout=1.0)
+
+    asyncio.run(scenario())
+
+
+def test_close_cancels_frames_being_collected():
+    """收集窗口内 close，已取出的帧同样被取消"""
+
+    async def scenario():
+        batcher = FrameBatcher(lambda params_list: params_list, max_batch_size=4, max_wait=0.5)
+        task = asyncio.create_task(batcher.submit("frame"))
+        await asyncio.sleep(0.05)
+        batcher.close()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(task, timeout=1.0)
+
+    asyncio.run(scenario())
@@ -5,7 +5,9 @@
 """
 
 import pytest
-import torch
+
+# 未安装 torch 的环境中跳过整个模块，而不是在收集阶段报错
+torch = pytest.importorskip("torch")
 from PIL import Image
 from pydantic import Field
 
@@ -165,3 +167,26 @@ def test_input_params_validation():
             prompt="test",
             guidance_scale=25.0  # 超出范围
         )
+
+
+def test_stack_frames_pads_to_batch_size():
+    """测试批处理帧一次性 stack 并用最后一帧补齐"""
+    from app.pipelines.streamdiffusion_base import StreamDiffusionBasePipeline
+
+    frames = [torch.full((1, 3, 4, 4), float(i)) for i in range(2)]
+    batch = StreamDiffusionBasePipeline._stack_frames(frames, 4)
+
+    assert batch.shape == (4, 3, 4, 4)
+    assert [float(batch[i, 0, 0, 0]) for i in range(4)] == [0.0, 1.0, 1.0, 1.0]
+
+
+def test_input_params_frozen():
+    """测试 InputParams 创建后不可修改，需通过 model_copy 覆盖"""
+    params = BasePipeline.InputParams(prompt="test")
+
+    with pytest.raises(Exception):
+        params.prompt = "changed"
+
+    updated = params.model_copy(update={"prompt": "changed"})
+    assert updated.prompt == "changed"
+    assert params.prompt == "test"
@@ -0,0 +1,89 @@
+"""
+测试 StreamDiffusion 通用基类的时间步调度
+
+用模拟的 StreamDiffusionWrapper 复现其按 num_inference_steps 网格索引 t_index 的行为。
+"""
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+_WRAPPER_FILE = Path(__file__).resolve().parents[1] / "lib" / "StreamDiffusion" / "utils" / "wrapper.py"
+if not _WRAPPER_FILE.exists():
+    pytest.skip("需要 StreamDiffusion 子模块", allow_module_level=True)
+
+from app.pipelines import streamdiffusion_base as sd_base
+
+
+class _FakeInnerStream:
+    """只保留 prepare 涉及的 StreamDiffusion 属性"""
+
+    cfg_type = "none"
+
+    def __init__(self, t_index_list):
+        self.t_list = list(t_index_list)
+        self.denoising_steps_num = len(self.t_list)
+        self.prompt_embeds = torch.zeros(1)
+        self.x_t_latent_buffer = None
+        self.sub_timesteps = []
+
+
+class _FakeWrapper:
+    def __init__(self, **config):
+        self.config = config
+        self.stream = _FakeInnerStream(config["t_index_list"])
+
+    def prepare(self, prompt, negative_prompt, num_inference_steps, guidance_scale, delta):
+        # 与 StreamDiffusion 一致：t_index 是 num_inference_steps 网格上的下标
+        timesteps = torch.linspace(999, 0, num_inference_steps).long()
+        self.stream.sub_timesteps = [int(timesteps[t]) for t in self.stream.t_list]
+
+
+class _AysPipeline(sd_base.StreamDiffusionBasePipeline):
+    def _get_initial_params(self):
+        return self.InputParams(prompt="a house", steps=4)
+
+    def _get_pipeline_config(self, params):
+        return {"warmup": 0}
+
+    def _preprocess_input_image(self, params):
+        return None
+
+
+@pytest.fixture
+def fake_wrapper(monkeypatch):
+    model = SimpleNamespace(
+        model_id="test-model", use_tiny_vae=False, use_lcm_lora=False, vae_id=None, acceleration="none"
+    )
+    monkeypatch.setattr(sd_base, "StreamDiffusionWrapper", _FakeWrapper)
+    monkeypatch.setattr(sd_base, "get_config", lambda: SimpleNamespace(model=model))
+    monkeypatch.setattr(sd_base, "_lora_options", lambda: ([], {}))
+
+
+def test_ays_stream_prepares_on_wrapper_grid(fake_wrapper):
+    """AYS 流按 _WRAPPER_TIMESTEPS 网格 prepare，不再越界"""
+    pipeline = _AysPipeline(
+        {"t_index_schedule": "ays", "reuse_warmup": False}, torch.device("cpu"), torch.float32
+    )
+    inner = pipeline.stream.stream
+    assert inner.t_list == list(sd_base.compute_ays_indices(4))
+    assert len(inner.sub_timesteps) == 4
+    assert inner.sub_timesteps == sorted(inner.sub_timesteps, reverse=True)
+
+    # steps 变化不改变调度网格
+    pipeline.prepare(prompt="a cat", steps=2, denoise=0.5)
+    assert len(inner.sub_timesteps) == 4
+
+
+def test_ays_passes_are_capped(fake_wrapper, monkeypatch):
+    """steps 很大时每帧 UNet 次数不超过 _AYS_MAX_PASSES"""
+    monkeypatch.setattr(
+        _AysPipeline, "_get_initial_params", lambda self: self.InputParams(prompt="a house", steps=10)
+    )
+    pipeline = _AysPipeline(
+        {"t_index_schedule": "ays", "reuse_warmup": False}, torch.device("cpu"), torch.float32
+    )
+    assert pipeline.stream.stream.denoising_steps_num == sd_base._AYS_MAX_PASSES
@@ -1,5 +1,10 @@
+from typing import Union
+
 from PIL import Image
 import io
+import torch
+
+from app.utils.image import encode_jpeg, get_turbo_jpeg_encoder
 
 
 def bytes_to_pil(image_bytes: bytes) -> Image.Image:
@@ -7,15 +12,44 @@ def bytes_to_pil(image_bytes: bytes) -> Image.Image:
     return image
 
 
+# multipart 帧头的固定部分预先编码，每帧只格式化 Content-Length
+_FRAME_HEADER = b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: "
+_HEADER_END = b"\r\n\r\n"
+_FRAME_END = b"\r\n"
+
+
+def _jpeg_to_frame(frame_data: bytes) -> bytes:
+    # 一次 join 拼接，避免逐个 + 产生与帧等大的中间 bytes
+    return b"".join((_FRAME_HEADER, b"%d" % len(frame_data), _HEADER_END, frame_data, _FRAME_END))
+
+
 def pil_to_frame(image: Image.Image) -> bytes:
-    frame_data = io.BytesIO()
-    image.save(frame_data, format="JPEG", quality=85)
-    frame_data = frame_data.getvalue()
-    return (
-        b"--frame\r\n"
-        + b"Content-Type: image/jpeg\r\n"
-        + f"Content-Length: {len(frame_data)}\r\n\r\n".encode()
-        + frame_data
-        + b"\r\n"
-    )
+    return _jpeg_to_frame(encode_jpeg(image, quality=85))
+
+
+def tensor_to_frame(image: torch.Tensor, quality: int = 85) -> bytes:
+    """把 [0, 1] 范围的 (C, H, W) 图像张量直接编码为 MJPEG 帧，省去 PIL 转换"""
+    if image.dim() == 4:
+        image = image[0]
+    data = image.detach().mul(255).clamp_(0, 255).to(torch.uint8)
+
+    turbo_encode = get_turbo_jpeg_encoder()
+    if turbo_encode is not None:
+        # 转成 HWC uint8 数组后交给 libjpeg-turbo（SIMD）编码
+        array = data.permute(1, 2, 0).contiguous().cpu().numpy()
+        return _jpeg_to_frame(turbo_encode(array, quality=quality))
+
+    from torchvision.io import encode_jpeg as tv_encode_jpeg
+
+    try:
+        # 新版 torchvision 支持在 GPU 上用 nvJPEG 编码
+        jpeg = tv_encode_jpeg(data, quality=quality)
+    except RuntimeError:
+        jpeg = tv_encode_jpeg(data.cpu(), quality=quality)
+    return _jpeg_to_frame(jpeg.cpu().numpy().tobytes())
+
 
+def image_to_frame(image: Union[Image.Image, torch.Tensor]) -> bytes:
+    if isinstance(image, torch.Tensor):
+        return tensor_to_frame(image)
+    return pil_to_frame(image)
@@ -5,19 +5,73 @@
 
 import io
 import logging
-from typing import Literal, Optional, Tuple
+import threading
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Callable, Literal, Optional, Tuple
 
-import numpy as np
 from PIL import Image
 
+if TYPE_CHECKING:
+    import numpy as np
+
 logger = logging.getLogger(__name__)
 
+# 每个线程复用一个编码缓冲，避免逐帧新建 BytesIO
+_local = threading.local()
+
+
+def _encode_buffer() -> io.BytesIO:
+    """返回当前线程已清空的编码缓冲"""
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None:
+        buffer = _local.buffer = io.BytesIO()
+    buffer.seek(0)
+    buffer.truncate()
+    return buffer
+
+
+@lru_cache(maxsize=None)
+def get_turbo_jpeg_encoder() -> Optional[Callable[..., bytes]]:
+    """延迟加载 libjpeg-turbo 的 RGB JPEG 编码函数，不可用时返回 None"""
+    try:
+        from turbojpeg import TJPF_RGB, TJSAMP_420, TurboJPEG
+
+        # 与 PIL 在 quality < 90 时的默认 4:2:0 色度采样一致
+        return partial(TurboJPEG().encode, pixel_format=TJPF_RGB, jpeg_subsample=TJSAMP_420)
+    except (ImportError, OSError, RuntimeError) as e:
+        # 未安装 PyTurboJPEG 或系统缺少 libturbojpeg
+        logger.info(f"TurboJPEG 不可用，JPEG 编码回退到 PIL: {e}")
+        return None
+
+
+def encode_jpeg(image: Image.Image, quality: int = 85) -> bytes:
+    """
+    JPEG 编码热路径：RGB 图像优先使用 libjpeg-turbo（SIMD DCT 与色彩转换），
+    否则回退到 PIL
+
+    Args:
+        image: PIL Image 对象
+        quality: 质量（1-100）
+
+    Returns:
+        JPEG 字节
+    """
+    turbo_encode = get_turbo_jpeg_encoder()
+    if turbo_encode is not None and image.mode == "RGB":
+        import numpy as np
+
+        return turbo_encode(np.asarray(image), quality=quality)
+
+    buffer = _encode_buffer()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
 
 def encode_image(
     image: Image.Image,
     format: Literal["JPEG", "PNG", "WEBP"] = "JPEG",
     quality: int = 85,
-    optimize: bool = True
+    optimize: bool = False
 ) -> bytes:
     """
     将 PIL Image 编码为字节流
@@ -26,13 +80,14 @@ def encode_image(
         image: PIL Image 对象
         format: 图像格式
         quality: 质量（1-100，仅用于 JPEG 和 WEBP）
-        optimize: 是否优化
+        optimize: JPEG 是否做二次 Huffman 表优化，编码耗时约翻倍而体积仅减小 1-3%，
+            默认关闭，只适合缓存后重复提供的静态图（仅在 PIL 回退路径生效）；PNG 始终优化
         
     Returns:
         编码后的图像字节
     """
     try:
-        buffer = io.BytesIO()
+        buffer = _encode_buffer()
         
         # 确保图像模式正确
         if format == "JPEG":
@@ -47,6 +102,11 @@ def encode_image(
             elif image.mode != "RGB":
                 image = image.convert("RGB")
             
+            turbo_encode = get_turbo_jpeg_encoder()
+            if turbo_encode is not None:
+                import numpy as np
+
+                return turbo_encode(np.asarray(image), quality=quality)
             image.save(buffer, format=format, quality=quality, optimize=optimize)
         
         elif format == "PNG":
@@ -54,7 +114,7 @@ def encode_image(
             if image.mode not in ("RGB", "RGBA"):
                 image = image.convert("RGBA")
             
-            image.save(buffer, format=format, optimize=optimize)
+            image.save(buffer, format=format, optimize=True)
         
         elif format == "WEBP":
             # WEBP 支持透明度
@@ -209,7 +269,7 @@ def convert_image_mode(
         raise RuntimeError(f"Failed to convert image mode: {e}")
 
 
-def image_to_numpy(image: Image.Image) -> np.ndarray:
+def image_to_numpy(image: Image.Image) -> "np.ndarray":
     """
     将 PIL Image 转换为 numpy 数组
     
@@ -219,6 +279,8 @@ def image_to_numpy(image: Image.Image) -> np.ndarray:
     Returns:
         numpy 数组 (H, W, C)
     """
+    import numpy as np
+
     try:
         return np.array(image)
     
@@ -227,7 +289,7 @@ def image_to_numpy(image: Image.Image) -> np.ndarray:
         raise RuntimeError(f"Failed to convert image to numpy: {e}")
 
 
-def numpy_to_image(array: np.ndarray) -> Image.Image:
+def numpy_to_image(array: "np.ndarray") -> Image.Image:
     """
     将 numpy 数组转换为 PIL Image
     
@@ -237,6 +299,8 @@ def numpy_to_image(array: np.ndarray) -> Image.Image:
     Returns:
         PIL Image 对象
     """
+    import numpy as np
+
     try:
         # 确保数据类型正确
         if array.dtype != np.uint8:
@@ -11,8 +11,6 @@ import logging
 import sys
 from typing import Literal, Optional
 
-import structlog
-
 
 def setup_logging(
     level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = "INFO",
@@ -48,7 +46,9 @@ def setup_logging(
         file_handler.setLevel(log_level)
         logging.root.addHandler(file_handler)
     
-    # 配置 structlog
+    # 配置 structlog（仅在配置日志时才导入）
+    import structlog
+
     if format == "json":
         processors = [
             structlog.contextvars.merge_contextvars,
@@ -115,12 +115,16 @@ class LogContext:
     
     def __enter__(self):
         """进入上下文"""
+        import structlog
+
         self.token = structlog.contextvars.bind_contextvars(**self.context)
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         """退出上下文"""
         if self.token:
+            import structlog
+
             structlog.contextvars.unbind_contextvars(*self.context.keys())
 
 
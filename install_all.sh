@@ -94,6 +94,10 @@ pip install -r requirements.txt
 
 echo -e "${GREEN}✓ 后端基础依赖安装完成${NC}"
 
+# 以 editable 方式安装本地 StreamDiffusion（依赖已由 requirements.txt 固定）
+echo -e "${CYAN}正在安装本地 StreamDiffusion...${NC}"
+pip install --no-deps -e app/lib/StreamDiffusion
+
 # 5. 安装 xformers 加速
 echo ""
 echo -e "${BLUE}⚡ 安装 xformers 内存优化加速...${NC}"
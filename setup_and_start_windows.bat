@@ -138,6 +138,14 @@ if %errorlevel% neq 0 (
     pause
     exit /b 1
 )
+
+REM 以 editable 方式安装本地 StreamDiffusion
+pip install --no-deps -e app\lib\StreamDiffusion
+if %errorlevel% neq 0 (
+    echo %RED%错误: 安装 StreamDiffusion 失败%NC%
+    pause
+    exit /b 1
+)
 echo %GREEN%✓ 后端依赖安装完成%NC%
 
 REM 检查Node.js是否安装
@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from app.services.frame_batcher import FrameBatcher
+
+
+@pytest.mark.asyncio
+async def test_concurrent_frames_share_one_batch():
+    calls = []
+
+    def predict_batch(params_list):
+        calls.append(list(params_list))
+        return [p * 10 for p in params_list]
+
+    batcher = FrameBatcher(predict_batch, max_batch_size=3, max_wait=0.05)
+    try:
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(3)))
+    finally:
+        batcher.close()
+
+    assert results == [0, 10, 20]
+    assert calls == [[0, 1, 2]]
+
+
+@pytest.mark.asyncio
+async def test_batch_errors_propagate_to_every_frame():
+    def predict_batch(params_list):
+        raise RuntimeError("boom")
+
+    batcher = FrameBatcher(predict_batch, max_batch_size=2, max_wait=0.01)
+    try:
+        results = await asyncio.gather(
+            batcher.submit(1), batcher.submit(2), return_exceptions=True
+        )
+    finally:
+        batcher.close()
+
+    assert all(isinstance(r, RuntimeError) for r in results)
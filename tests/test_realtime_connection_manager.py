@@ -123,6 +123,26 @@ async def test_all_strategy_blocks_until_data_available():
     assert getattr(result, "value") == "ready"
 
 
+@pytest.mark.asyncio
+async def test_has_pending_data_reflects_queue_state():
+    mgr = ConnectionManager(drain_strategy="all")
+    user_id = uuid4()
+
+    assert mgr.has_pending_data(user_id) is False
+
+    mgr.active_connections[user_id] = {
+        "websocket": None,
+        "queue": asyncio.Queue(),
+    }
+    assert mgr.has_pending_data(user_id) is False
+
+    await mgr.update_data(user_id, SimpleNamespace(value=1))
+    assert mgr.has_pending_data(user_id) is True
+
+    await mgr.get_latest_data(user_id)
+    assert mgr.has_pending_data(user_id) is False
+
+
 class _DummyWebSocket:
     def __init__(self, message):
         self._message = message